@@ -0,0 +1,157 @@
+import asyncio
+import json
+import zlib
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import BotoCoreError, ClientError
+import structlog
+
+from agent.aws import AWSClients
+
+logger = structlog.get_logger()
+
+# S3 rejects multipart parts smaller than this, except for the last one
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+# Streams events to S3 as gzip NDJSON, uploading parts as they fill so memory stays bounded
+class ArtifactStream:
+    def __init__(self, aws: AWSClients, bucket: str, key: str, part_size: int = 8 * 1024 * 1024):
+        self.aws = aws
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, S3_MIN_PART_SIZE)
+        self.events_written = 0
+        self.bytes_written = 0
+
+        # wbits=31 produces a gzip container
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: List[Dict[str, Any]] = []
+        self._pending_part: Optional[asyncio.Task] = None
+        self._failed = False
+
+    async def write(self, event: Dict[str, Any]):
+        if self._failed:
+            return
+
+        line = json.dumps(event, default=str).encode("utf-8") + b"\n"
+        self._buffer += self._compressor.compress(line)
+        self.events_written += 1
+
+        if len(self._buffer) >= self.part_size:
+            await self._start_part(bytes(self._buffer))
+            self._buffer.clear()
+
+    async def complete(self) -> bool:
+        if self._failed:
+            await self.abort()
+            return False
+
+        self._buffer += self._compressor.flush()
+        body = bytes(self._buffer)
+        self._buffer.clear()
+
+        try:
+            if self._upload_id is None:
+                # Small run: nothing was uploaded yet, write a single object
+                s3 = await self.aws.s3()
+                await s3.put_object(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    Body=body,
+                    ContentType='application/x-ndjson',
+                    ContentEncoding='gzip'
+                )
+                self.bytes_written += len(body)
+                return True
+
+            await self._start_part(body)
+            await self._wait_for_part()
+            if self._failed:
+                await self.abort()
+                return False
+
+            s3 = await self.aws.s3()
+            await s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts}
+            )
+            return True
+        except (BotoCoreError, ClientError) as e:
+            logger.error("Failed to complete artifact upload", key=self.key, error=str(e))
+            self._failed = True
+            await self.abort()
+            return False
+
+    async def abort(self):
+        self._failed = True
+        self._buffer.clear()
+        if self._pending_part:
+            self._pending_part.cancel()
+            try:
+                await self._pending_part
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._pending_part = None
+
+        if self._upload_id is None:
+            return
+
+        upload_id, self._upload_id = self._upload_id, None
+        try:
+            s3 = await self.aws.s3()
+            await s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=upload_id)
+        except (BotoCoreError, ClientError) as e:
+            logger.warning("Failed to abort artifact upload", key=self.key, error=str(e))
+
+    async def _start_part(self, body: bytes):
+        # At most one part is in flight; it uploads while the next one is buffered
+        await self._wait_for_part()
+        if self._failed:
+            return
+
+        if self._upload_id is None:
+            try:
+                s3 = await self.aws.s3()
+                response = await s3.create_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    ContentType='application/x-ndjson',
+                    ContentEncoding='gzip'
+                )
+            except (BotoCoreError, ClientError) as e:
+                logger.error("Failed to start artifact upload", key=self.key, error=str(e))
+                self._failed = True
+                return
+            self._upload_id = response["UploadId"]
+
+        part_number = len(self._parts) + 1
+        self._parts.append({"PartNumber": part_number})
+        self._pending_part = asyncio.create_task(self._upload_part(part_number, body))
+
+    async def _upload_part(self, part_number: int, body: bytes):
+        s3 = await self.aws.s3()
+        response = await s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        self._parts[part_number - 1]["ETag"] = response["ETag"]
+        self.bytes_written += len(body)
+
+    async def _wait_for_part(self):
+        if not self._pending_part:
+            return
+
+        task, self._pending_part = self._pending_part, None
+        try:
+            await task
+        except (BotoCoreError, ClientError) as e:
+            logger.error("Failed to upload artifact part", key=self.key, error=str(e))
+            self._failed = True
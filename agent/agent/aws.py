@@ -0,0 +1,66 @@
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, Dict
+
+import aioboto3
+from aiobotocore.config import AioConfig
+import structlog
+
+from agent.config import config
+
+logger = structlog.get_logger()
+
+
+# Shared async SQS and S3 clients, created on first use with one connection pool per service
+class AWSClients:
+    def __init__(self):
+        self.session = aioboto3.Session()
+        self._stack = AsyncExitStack()
+        self._clients: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+
+    async def sqs(self):
+        return await self._get_client('sqs')
+
+    async def s3(self):
+        return await self._get_client('s3')
+
+    async def close(self):
+        async with self._lock:
+            self._clients.clear()
+            await self._stack.aclose()
+            self._stack = AsyncExitStack()
+        logger.info("Closed AWS clients")
+
+    async def _get_client(self, service_name: str):
+        client = self._clients.get(service_name)
+        if client is not None:
+            return client
+
+        async with self._lock:
+            if service_name not in self._clients:
+                self._clients[service_name] = await self._stack.enter_async_context(
+                    self.session.client(service_name, **self._client_kwargs())
+                )
+            return self._clients[service_name]
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "region_name": config.aws_region,
+            "config": AioConfig(
+                max_pool_connections=config.aws_max_pool_connections,
+                # Long polls hold a connection for up to 20 seconds
+                read_timeout=60,
+                retries={"max_attempts": 3, "mode": "standard"}
+            )
+        }
+
+        if config.aws_endpoint_url:
+            # LocalStack or custom endpoint
+            kwargs.update(
+                endpoint_url=config.aws_endpoint_url,
+                aws_access_key_id=config.aws_access_key_id or "test",
+                aws_secret_access_key=config.aws_secret_access_key or "test"
+            )
+
+        return kwargs
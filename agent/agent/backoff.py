@@ -0,0 +1,22 @@
+import random
+from typing import Optional
+
+
+# Exponential backoff with full jitter, so workers that failed together don't retry in lockstep
+class ExponentialBackoff:
+    def __init__(self, base: float, cap: float, rng: Optional[random.Random] = None):
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
+        self._rng = rng or random.Random()
+
+    def ceiling(self, attempt: int) -> float:
+        return min(self.cap, self.base * (2 ** attempt))
+
+    def next_delay(self) -> float:
+        delay = self._rng.uniform(0, self.ceiling(self.attempts))
+        self.attempts += 1
+        return delay
+
+    def reset(self):
+        self.attempts = 0
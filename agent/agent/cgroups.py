@@ -0,0 +1,167 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+CGROUP_MOUNT = "/sys/fs/cgroup"
+
+# Controllers enabled for session cgroups, when the kernel offers them
+SESSION_CONTROLLERS = ("cpu", "memory", "pids", "io")
+
+# Leaf the worker's own processes move into so sibling session cgroups can get controllers
+WORKER_CGROUP_NAME = "agent-worker"
+
+
+def _own_cgroup() -> Optional[str]:
+    # cgroup v2 entry of /proc/self/cgroup: "0::/path"
+    try:
+        with open("/proc/self/cgroup", "r") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return line[3:].strip()
+    except OSError:
+        pass
+    return None
+
+
+def _write(path: Path, value: str):
+    with open(path, "w") as f:
+        f.write(value)
+
+
+class SessionCgroup:
+    def __init__(self, path: Path):
+        self.path = path
+
+    def wrap_command(self, argv: List[str]) -> List[str]:
+        # Entering the group from a preexec_fn isn't safe in a threaded
+        # process, so a shell moves itself in first and then execs the
+        # command; the pid stays the same and everything it spawns starts
+        # inside the group.
+        return ["/bin/sh", "-c", 'echo 0 > "$1" && shift && exec "$@"', "sh", str(self.path / "cgroup.procs"), *argv]
+
+    def stats(self) -> Dict[str, int]:
+        stats: Dict[str, int] = {}
+        try:
+            with open(self.path / "cpu.stat", "r") as f:
+                for line in f:
+                    key, _, value = line.partition(" ")
+                    if key == "usage_usec":
+                        stats["cpu_usec"] = int(value)
+        except (OSError, ValueError):
+            pass
+
+        for name, key in (("memory.peak", "memory_peak_bytes"), ("memory.current", "memory_current_bytes")):
+            try:
+                stats[key] = int((self.path / name).read_text().strip())
+            except (OSError, ValueError):
+                pass
+
+        try:
+            read_bytes = write_bytes = 0
+            with open(self.path / "io.stat", "r") as f:
+                for line in f:
+                    for field in line.split()[1:]:
+                        name, _, value = field.partition("=")
+                        if name == "rbytes":
+                            read_bytes += int(value)
+                        elif name == "wbytes":
+                            write_bytes += int(value)
+            stats["read_bytes"] = read_bytes
+            stats["write_bytes"] = write_bytes
+        except (OSError, ValueError):
+            pass
+        return stats
+
+    def remove(self):
+        try:
+            # Kill stragglers (kernel 5.14+) so the empty group can be removed
+            kill_file = self.path / "cgroup.kill"
+            if kill_file.exists():
+                _write(kill_file, "1")
+            self.path.rmdir()
+        except OSError as e:
+            logger.warning("Failed to remove session cgroup", path=str(self.path), error=str(e))
+
+
+# Per-session cgroup v2 limits; turns itself off when the host can't provide them
+class CgroupManager:
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        cpu_weight: Optional[int] = None,
+        memory_max: Optional[int] = None,
+        pids_max: Optional[int] = None
+    ):
+        self.cpu_weight = cpu_weight
+        self.memory_max = memory_max
+        self.pids_max = pids_max
+        self.controllers: tuple = ()
+        self.root: Optional[Path] = None
+
+        if root:
+            self.root = Path(root)
+        else:
+            own = _own_cgroup()
+            if own is not None:
+                self.root = Path(CGROUP_MOUNT) / own.lstrip("/")
+
+        try:
+            self.available = self.root is not None and self._setup()
+        except OSError as e:
+            logger.warning("cgroup v2 unavailable, sessions run without resource limits", error=str(e))
+            self.available = False
+
+    def _setup(self) -> bool:
+        controllers_file = self.root / "cgroup.controllers"
+        if not controllers_file.exists():
+            logger.warning("cgroup v2 unavailable, sessions run without resource limits", root=str(self.root))
+            return False
+
+        offered = controllers_file.read_text().split()
+        self.controllers = tuple(c for c in SESSION_CONTROLLERS if c in offered)
+
+        # Move our own processes out of the parent group into a leaf
+        procs = [p for p in (self.root / "cgroup.procs").read_text().split() if p.strip()]
+        if procs:
+            worker_group = self.root / WORKER_CGROUP_NAME
+            worker_group.mkdir(exist_ok=True)
+            for pid in procs:
+                try:
+                    _write(worker_group / "cgroup.procs", pid)
+                except ProcessLookupError:
+                    pass
+
+        if self.controllers:
+            _write(self.root / "cgroup.subtree_control", " ".join(f"+{c}" for c in self.controllers))
+
+        logger.info("Using cgroups for sessions", root=str(self.root), controllers=list(self.controllers))
+        return True
+
+    def create(self, session_id: str) -> Optional[SessionCgroup]:
+        if not self.available:
+            return None
+
+        path = self.root / f"session-{session_id}"
+        try:
+            path.mkdir(exist_ok=True)
+            if self.cpu_weight and "cpu" in self.controllers:
+                _write(path / "cpu.weight", str(self.cpu_weight))
+            if self.memory_max and "memory" in self.controllers:
+                _write(path / "memory.max", str(self.memory_max))
+                # Keep the group from spilling into swap instead of hitting its limit
+                swap_max = path / "memory.swap.max"
+                if swap_max.exists():
+                    _write(swap_max, "0")
+            if self.pids_max and "pids" in self.controllers:
+                _write(path / "pids.max", str(self.pids_max))
+        except OSError as e:
+            logger.warning("Failed to create session cgroup", session_id=session_id, error=str(e))
+            try:
+                path.rmdir()
+            except OSError:
+                pass
+            return None
+        return SessionCgroup(path)
@@ -0,0 +1,91 @@
+import functools
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Install locations checked when claude is not on PATH
+COMMON_PATHS = (
+    "/usr/local/bin/claude",
+    "/usr/bin/claude",
+    "/home/node/.npm-global/bin/claude",
+    "/usr/local/lib/node_modules/@anthropic-ai/claude-code/bin/claude",
+)
+
+DEFAULT_VERSION_CACHE = os.path.join("~", ".cache", "claude-agent", "claude-version.json")
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_claude_binary(override: Optional[str] = None) -> str:
+    # Finds the CLI without spawning anything: the override, then PATH, then the usual install locations
+    if override:
+        path = shutil.which(override)
+        if path:
+            return path
+        logger.warning("Configured Claude binary not found, falling back to search", binary=override)
+
+    path = shutil.which("claude")
+    if path:
+        return path
+
+    for candidate in COMMON_PATHS:
+        if os.access(candidate, os.X_OK):
+            return candidate
+
+    # Default to assuming it's in PATH
+    return "claude"
+
+
+def claude_version(binary: str, cache_path: Optional[str] = None, timeout: float = 15.0) -> Optional[str]:
+    # Cached on disk by path, size and mtime so restarts don't start Node just to print a version
+    try:
+        resolved = os.path.realpath(shutil.which(binary) or binary)
+        stat = os.stat(resolved)
+    except OSError:
+        return None
+
+    key = f"{resolved}:{stat.st_size}:{stat.st_mtime_ns}"
+    cache_file = os.path.expanduser(cache_path or DEFAULT_VERSION_CACHE)
+    cache = _read_cache(cache_file)
+    if key in cache:
+        return cache[key]
+
+    try:
+        result = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning("Failed to run Claude binary", binary=binary, error=str(e))
+        return None
+    if result.returncode != 0:
+        logger.warning("Claude binary version check failed", binary=binary, stderr=result.stderr.strip()[-500:])
+        return None
+
+    version = result.stdout.strip().splitlines()[0] if result.stdout.strip() else ""
+    _write_cache(cache_file, {key: version})
+    return version
+
+
+def _read_cache(cache_file: str) -> dict:
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _write_cache(cache_file: str, cache: dict):
+    # Write atomically; several workers may start on the same host at once
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_file)
+    except OSError as e:
+        logger.debug("Failed to write Claude version cache", path=cache_file, error=str(e))
@@ -7,23 +7,50 @@ class AgentConfig(BaseSettings):
     # Claude authentication
     anthropic_api_key: Optional[str] = Field(None, env="ANTHROPIC_API_KEY")
     claude_model: str = Field("claude-3-sonnet-20240229", env="CLAUDE_MODEL")
+    # Command name or path of the Claude Code CLI; searched for when unset
+    claude_binary: Optional[str] = Field(None, env="CLAUDE_BINARY")
+    claude_version_cache_path: str = Field("~/.cache/claude-agent/claude-version.json", env="CLAUDE_VERSION_CACHE_PATH")
     
     # AWS configuration
     aws_endpoint_url: Optional[str] = Field(None, env="AWS_ENDPOINT_URL")
     aws_region: str = Field("us-east-1", env="AWS_REGION")
     aws_access_key_id: Optional[str] = Field(None, env="AWS_ACCESS_KEY_ID")
     aws_secret_access_key: Optional[str] = Field(None, env="AWS_SECRET_ACCESS_KEY")
+    aws_max_pool_connections: int = Field(50, env="AWS_MAX_POOL_CONNECTIONS")
     
     # SQS configuration
     sqs_queue_url: Optional[str] = Field(None, env="SQS_QUEUE_URL")
     sqs_result_queue_url: Optional[str] = Field(None, env="SQS_RESULT_QUEUE_URL")
+    status_batch_size: int = Field(10, env="STATUS_BATCH_SIZE")
+    status_flush_interval_seconds: float = Field(1.0, env="STATUS_FLUSH_INTERVAL_SECONDS")
     max_task_retries: int = Field(3, env="MAX_TASK_RETRIES")
+    # Delay before a retryable failure is retried, doubling per attempt up to the max
+    retry_backoff_base_seconds: float = Field(30.0, env="RETRY_BACKOFF_BASE_SECONDS")
+    retry_backoff_max_seconds: float = Field(900.0, env="RETRY_BACKOFF_MAX_SECONDS")
+    sqs_visibility_timeout_seconds: int = Field(300, env="SQS_VISIBILITY_TIMEOUT_SECONDS")
+    sqs_visibility_max_extension_seconds: int = Field(1800, env="SQS_VISIBILITY_MAX_EXTENSION_SECONDS")
+    sqs_receive_wait_seconds: int = Field(20, env="SQS_RECEIVE_WAIT_SECONDS")  # Long polling, max 20
+    poll_error_backoff_base_seconds: float = Field(1.0, env="POLL_ERROR_BACKOFF_BASE_SECONDS")
+    poll_error_backoff_max_seconds: float = Field(60.0, env="POLL_ERROR_BACKOFF_MAX_SECONDS")
+    # JSON list of lanes, e.g. [{"name": "interactive", "queue_url": "...", "weight": 3, "max_concurrent": 2}];
+    # empty means a single lane on SQS_QUEUE_URL
+    sqs_lanes: str = Field("", env="SQS_LANES")
+    # Long poll wait while other lanes are waiting for a slot, so an idle lane doesn't hold one for long
+    sqs_contended_wait_seconds: int = Field(1, env="SQS_CONTENDED_WAIT_SECONDS")
     
     # S3 configuration
     s3_bucket_name: str = Field("claude-agent-artifacts", env="S3_BUCKET_NAME")
+    artifact_part_size_bytes: int = Field(8 * 1024 * 1024, env="ARTIFACT_PART_SIZE_BYTES")
     
     # Redis configuration
     redis_url: Optional[str] = Field(None, env="REDIS_URL")
+    # Cache results of read-only runs by repository commit, mode and prompt (requires Redis)
+    result_cache_enabled: bool = Field(False, env="RESULT_CACHE_ENABLED")
+    result_cache_ttl_seconds: int = Field(86400, env="RESULT_CACHE_TTL_SECONDS")
+    result_cache_max_bytes: int = Field(256 * 1024 * 1024, env="RESULT_CACHE_MAX_BYTES")
+    result_cache_max_entry_bytes: int = Field(8 * 1024 * 1024, env="RESULT_CACHE_MAX_ENTRY_BYTES")
+    # Bound on resolving the remote HEAD for a lookup; on timeout the task runs uncached
+    result_cache_lookup_timeout_seconds: float = Field(10.0, env="RESULT_CACHE_LOOKUP_TIMEOUT_SECONDS")
     
     # GitHub configuration
     gh_token: Optional[str] = Field(None, env="GH_TOKEN")
@@ -31,16 +58,63 @@ class AgentConfig(BaseSettings):
     # Session configuration
     session_base_dir: str = Field("/tmp/claude-sessions", env="SESSION_BASE_DIR")
     artifacts_base_dir: str = Field("/tmp/claude-artifacts", env="ARTIFACTS_BASE_DIR")
+    session_retention_seconds: float = Field(0, env="SESSION_RETENTION_SECONDS")
+    session_disk_high_water_percent: float = Field(85.0, env="SESSION_DISK_HIGH_WATER_PERCENT")
+    session_cleanup_throttle_seconds: float = Field(0.0, env="SESSION_CLEANUP_THROTTLE_SECONDS")
+    # Per-session cgroup v2 limits; ignored where cgroups can't be managed
+    session_cgroups_enabled: bool = Field(False, env="SESSION_CGROUPS_ENABLED")
+    session_cgroup_root: Optional[str] = Field(None, env="SESSION_CGROUP_ROOT")  # Defaults to the worker's own cgroup
+    session_cpu_weight: int = Field(100, env="SESSION_CPU_WEIGHT")
+    session_memory_max_bytes: Optional[int] = Field(None, env="SESSION_MEMORY_MAX_BYTES")
+    session_pids_max: Optional[int] = Field(4096, env="SESSION_PIDS_MAX")
+    
+    # Warm session pool (disabled when size is 0)
+    warm_pool_size: int = Field(0, env="WARM_POOL_SIZE")
+    warm_pool_repositories: str = Field("", env="WARM_POOL_REPOSITORIES")  # Comma-separated URLs
+    warm_pool_install_command: Optional[str] = Field(None, env="WARM_POOL_INSTALL_COMMAND")
+    
+    # Repository cache configuration
+    repo_cache_enabled: bool = Field(True, env="REPO_CACHE_ENABLED")
+    repo_cache_dir: str = Field("/tmp/claude-repo-cache", env="REPO_CACHE_DIR")
+    repo_cache_fetch_interval_seconds: float = Field(10.0, env="REPO_CACHE_FETCH_INTERVAL_SECONDS")
+    # Mirrors unused this long are removed, as are the least recently used ones past the size budget
+    repo_cache_max_bytes: int = Field(20 * 1024 ** 3, env="REPO_CACHE_MAX_BYTES")
+    repo_cache_max_age_seconds: float = Field(7 * 24 * 3600.0, env="REPO_CACHE_MAX_AGE_SECONDS")
+    # clone, worktree (read-only modes) or reflink; requires the repository cache
+    workspace_backing: str = Field("clone", env="WORKSPACE_BACKING")
+    # Used when cloning straight from the remote; cached clones always carry full history
+    readonly_clone_depth: Optional[int] = Field(None, env="READONLY_CLONE_DEPTH")
+    readonly_clone_filter: Optional[str] = Field("blob:none", env="READONLY_CLONE_FILTER")
     
     # Agent configuration
     max_concurrent_tasks: int = Field(5, env="MAX_CONCURRENT_TASKS")
     task_timeout_seconds: int = Field(3600, env="TASK_TIMEOUT_SECONDS")  # 1 hour
+    # Stop the Claude process after this long without output (0 disables)
+    task_idle_timeout_seconds: int = Field(600, env="TASK_IDLE_TIMEOUT_SECONDS")
+    # Time between SIGTERM and SIGKILL when stopping a task
+    task_kill_grace_seconds: float = Field(10.0, env="TASK_KILL_GRACE_SECONDS")
+    # How long shutdown waits for running tasks before cancelling them (their messages are returned to the queue)
+    shutdown_grace_seconds: float = Field(120.0, env="SHUTDOWN_GRACE_SECONDS")
+    # Redis pub/sub channel carrying the ids of tasks to cancel
+    task_cancel_channel: str = Field("agent:cancel", env="TASK_CANCEL_CHANNEL")
+    # How often the Claude process tree is sampled for CPU, memory and I/O
+    resource_sample_interval_seconds: float = Field(1.0, env="RESOURCE_SAMPLE_INTERVAL_SECONDS")
+    # Longer stdout lines from the Claude CLI are discarded
+    claude_max_line_bytes: int = Field(256 * 1024 * 1024, env="CLAUDE_MAX_LINE_BYTES")
+    # keep, drop, aggregate or sample; see agent.event_parser
+    event_retention: str = Field("aggregate", env="EVENT_RETENTION")
+    event_sample_every: int = Field(50, env="EVENT_SAMPLE_EVERY")
     
     # Application configuration
     port: int = Field(8080, env="PORT")
     environment: str = Field("production", env="ENV")
     log_level: str = Field("INFO", env="LOG_LEVEL")
     
+    # Health checks
+    health_cache_ttl_seconds: float = Field(5.0, env="HEALTH_CACHE_TTL_SECONDS")
+    health_probe_timeout_seconds: float = Field(2.0, env="HEALTH_PROBE_TIMEOUT_SECONDS")
+    health_min_free_disk_percent: float = Field(5.0, env="HEALTH_MIN_FREE_DISK_PERCENT")
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
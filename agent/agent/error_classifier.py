@@ -0,0 +1,142 @@
+import random
+import re
+from typing import Any, Dict, NamedTuple, Optional
+
+from agent.backoff import ExponentialBackoff
+from agent.supervisor import STOP_CANCELLED, STOP_IDLE_TIMEOUT, STOP_TIMEOUT
+
+
+class Classification(NamedTuple):
+    retryable: bool
+    cause: str
+    # How long the message stays invisible before the retry (0 when not retrying)
+    delay_seconds: int = 0
+
+
+# Anthropic API error types as they appear in stream-json error events
+STREAM_ERROR_TYPES = {
+    "rate_limit_error": (True, "rate_limit"),
+    "overloaded_error": (True, "overloaded"),
+    "api_error": (True, "api_error"),
+    "timeout_error": (True, "network"),
+    "invalid_request_error": (False, "invalid_request"),
+    "request_too_large": (False, "invalid_request"),
+    "authentication_error": (False, "auth"),
+    "permission_error": (False, "auth"),
+    "billing_error": (False, "auth"),
+    "not_found_error": (False, "invalid_request"),
+}
+
+HTTP_STATUSES = {
+    408: (True, "network"),
+    429: (True, "rate_limit"),
+    500: (True, "api_error"),
+    502: (True, "api_error"),
+    503: (True, "overloaded"),
+    504: (True, "network"),
+    529: (True, "overloaded"),
+    400: (False, "invalid_request"),
+    401: (False, "auth"),
+    403: (False, "auth"),
+    404: (False, "invalid_request"),
+    413: (False, "invalid_request"),
+}
+
+_HTTP_STATUS = re.compile(r"(?:API Error:|status(?: code)?[:=]?|HTTP/\d(?:\.\d)?)\s*(\d{3})\b", re.IGNORECASE)
+_RETRY_AFTER = re.compile(r"retry[- ]after\D{0,3}(\d+)", re.IGNORECASE)
+_EXIT_CODE = re.compile(r"exit code (-?\d+)")
+
+# Checked in order against the error message (including the stderr tail); first match wins
+PATTERNS = (
+    (re.compile(r"rate.?limit|too many requests", re.IGNORECASE), True, "rate_limit"),
+    (re.compile(r"overloaded", re.IGNORECASE), True, "overloaded"),
+    (re.compile(r"repository not found|could not read username|authentication failed for|"
+                r"remote branch .* not found", re.IGNORECASE), False, "clone"),
+    (re.compile(r"invalid (?:x-)?api.?key|authentication|unauthori[sz]ed|no claude authentication|"
+                r"credit balance|oauth token", re.IGNORECASE), False, "auth"),
+    (re.compile(r"prompt is too long|context (?:length|window)|max_tokens", re.IGNORECASE), False, "invalid_request"),
+    (re.compile(r"missing required parameters", re.IGNORECASE), False, "invalid_task"),
+    (re.compile(r"ECONNRESET|ECONNREFUSED|ETIMEDOUT|EAI_AGAIN|ENETUNREACH|socket hang up|"
+                r"could not resolve host|connection (?:reset|refused|timed out)|network|"
+                r"early EOF|RPC failed|temporar", re.IGNORECASE), True, "network"),
+    (re.compile(r"timed? ?out", re.IGNORECASE), True, "network"),
+    (re.compile(r"ENOSPC|no space left", re.IGNORECASE), True, "disk_full"),
+)
+
+# Retrying helps when the process was killed from outside, not when the CLI itself is missing
+EXIT_CODES = {
+    126: (False, "claude_missing"),
+    127: (False, "claude_missing"),
+    -15: (True, "terminated"),
+    143: (True, "terminated"),
+}
+
+
+# Decides whether a failed task is retried and after how long; anything unrecognised is permanent
+class ErrorClassifier:
+    def __init__(self, base: float, cap: float, rng: Optional[random.Random] = None):
+        self._rng = rng or random.Random()
+        self.backoff = ExponentialBackoff(base, cap, self._rng)
+
+    def classify(self, error_event: Optional[Dict[str, Any]], attempt: int = 1) -> Classification:
+        if error_event is None:
+            # The run ended without a result or an error
+            return Classification(False, "incomplete")
+
+        retryable, cause = self._match(error_event)
+        if not retryable:
+            return Classification(False, cause)
+        return Classification(True, cause, self.delay(attempt, self._text(error_event)))
+
+    def delay(self, attempt: int, text: str = "") -> int:
+        ceiling = self.backoff.ceiling(max(0, attempt - 1))
+        # Equal jitter: spread retries out without ever retrying immediately
+        delay = ceiling / 2 + self._rng.uniform(0, ceiling / 2)
+        retry_after = _RETRY_AFTER.search(text)
+        if retry_after:
+            delay = max(delay, min(float(retry_after.group(1)), self.backoff.cap))
+        return int(round(delay))
+
+    def _match(self, error_event: Dict[str, Any]):
+        reason = error_event.get("reason")
+        if reason == STOP_CANCELLED:
+            return False, "cancelled"
+        if reason == STOP_TIMEOUT:
+            # A run that used up the whole time limit would most likely do so again
+            return False, "timeout"
+        if reason == STOP_IDLE_TIMEOUT:
+            return True, "idle_timeout"
+
+        error = error_event.get("error")
+        if isinstance(error, dict):
+            match = STREAM_ERROR_TYPES.get(error.get("type") or "")
+            if match:
+                return match
+
+        text = self._text(error_event)
+        status = _HTTP_STATUS.search(text)
+        if status and int(status.group(1)) in HTTP_STATUSES:
+            return HTTP_STATUSES[int(status.group(1))]
+
+        exit_code = error_event.get("exit_code")
+        if exit_code is None:
+            code = _EXIT_CODE.search(text)
+            exit_code = int(code.group(1)) if code else None
+        if exit_code in EXIT_CODES:
+            return EXIT_CODES[exit_code]
+
+        for pattern, retryable, cause in PATTERNS:
+            if pattern.search(text):
+                return retryable, cause
+
+        if exit_code is not None:
+            return False, "claude_exit"
+        if text.startswith("Failed to clone repository"):
+            return False, "clone"
+        return False, "task_error"
+
+    def _text(self, error_event: Dict[str, Any]) -> str:
+        error = error_event.get("error", "")
+        if isinstance(error, dict):
+            return f"{error.get('type', '')}: {error.get('message', '')}"
+        return str(error)
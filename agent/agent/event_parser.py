@@ -1,11 +1,32 @@
 import json
-import re
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, Union
 from enum import Enum
 import structlog
 
+from agent.config import config
+
 logger = structlog.get_logger()
 
+# Use a fast JSON decoder when one is installed; both accept bytes directly
+try:
+    import orjson
+    
+    JSON_BACKEND = "orjson"
+    _loads = orjson.loads
+    _DECODE_ERRORS: tuple = (orjson.JSONDecodeError,)
+except ImportError:
+    try:
+        import msgspec
+        
+        JSON_BACKEND = "msgspec"
+        _loads = msgspec.json.Decoder().decode
+        _DECODE_ERRORS = (msgspec.DecodeError,)
+    except ImportError:
+        JSON_BACKEND = "json"
+        _loads = json.loads
+        _DECODE_ERRORS = (json.JSONDecodeError, UnicodeDecodeError)
+
 
 class EventType(str, Enum):
     TOOL_USE = "tool_use"
@@ -15,106 +36,256 @@ class EventType(str, Enum):
     PROGRESS = "progress"
     COMPLETION = "completion"
     OUTPUT = "output"
+    STDERR = "stderr"
+
+
+# The second-resolution part of the timestamp only changes once per second
+_timestamp_second = -1
+_timestamp_prefix = ""
+
+
+def utc_timestamp() -> str:
+    global _timestamp_second, _timestamp_prefix
+    
+    now = time.time()
+    second = int(now)
+    if second != _timestamp_second:
+        _timestamp_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _timestamp_second = second
+    return f"{_timestamp_prefix}.{int((now - second) * 1_000_000):06d}Z"
+
+
+# Returned by event handlers to fall back to a generic OUTPUT event
+_UNHANDLED = object()
+
+# What to do with high-volume streaming events (text deltas, pings):
+#   keep      - pass every event through as OUTPUT
+#   drop      - discard them
+#   aggregate - fold text deltas into one MESSAGE event per content block
+#   sample    - pass through one in every event_sample_every deltas
+EVENT_RETENTION_POLICIES = ("keep", "drop", "aggregate", "sample")
+
+# Delta types that aggregate into message text, and the field holding the text
+_TEXT_DELTA_FIELDS = {"text_delta": "text", "thinking_delta": "thinking"}
 
 
 class ClaudeOutputParser:
-    def __init__(self):
+    def __init__(self, retention: Optional[str] = None, sample_every: Optional[int] = None):
         self.buffer = ""
         self.file_changes: List[Dict[str, Any]] = []
-        self.current_tool_use: Optional[Dict[str, Any]] = None
+        # Open tool_use blocks by content block index; partial_json fragments
+        # are collected and parsed once when the block stops
+        self.tool_blocks: Dict[int, Dict[str, Any]] = {}
+        # Open text/thinking blocks by content block index (aggregate policy)
+        self.text_blocks: Dict[int, Dict[str, Any]] = {}
+        
+        self.retention = retention or config.event_retention
+        if self.retention not in EVENT_RETENTION_POLICIES:
+            logger.warning("Unknown event retention policy, using aggregate", retention=self.retention)
+            self.retention = "aggregate"
+        self.sample_every = max(1, sample_every or config.event_sample_every)
+        self.deltas_seen = 0
+        self.events_dropped = 0
+        
+        self._handlers = {
+            "message_start": self._on_message_start,
+            "content_block_start": self._on_content_block_start,
+            "content_block_delta": self._on_content_block_delta,
+            "content_block_stop": self._on_content_block_stop,
+            "message_delta": self._on_message_delta,
+            "ping": self._on_ping,
+            "error": self._on_error,
+        }
         
-    def parse_line(self, line: str) -> Optional[Dict[str, Any]]:
-        line = line.strip()
-        if not line:
+    def parse_line(self, line: Union[bytes, str]) -> Optional[Dict[str, Any]]:
+        if not line or line.isspace():
             return None
             
         try:
             # Try to parse as JSON (stream-json format)
-            event = json.loads(line)
-            return self._process_json_event(event)
-        except json.JSONDecodeError:
-            # Not JSON, treat as plain output
+            event = _loads(line)
+        except _DECODE_ERRORS:
+            event = None
+            
+        if not isinstance(event, dict):
+            # Not a JSON event, treat as plain output
+            if isinstance(line, bytes):
+                line = line.decode('utf-8', errors='replace')
             return {
                 "type": EventType.OUTPUT,
-                "text": line,
-                "timestamp": self._get_timestamp()
+                "text": line.strip(),
+                "timestamp": utc_timestamp()
             }
             
-    def _process_json_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
-        event_type = event.get("type", "")
+        return self._process_json_event(event)
         
-        if event_type == "message_start":
-            return {
-                "type": EventType.PROGRESS,
-                "status": "started",
-                "message": "Claude is processing your request",
-                "timestamp": self._get_timestamp()
-            }
-            
-        elif event_type == "content_block_start":
-            content_block = event.get("content_block", {})
-            if content_block.get("type") == "tool_use":
-                self.current_tool_use = {
-                    "tool_name": content_block.get("name", ""),
-                    "tool_id": content_block.get("id", ""),
-                    "parameters": {}
-                }
-                return {
-                    "type": EventType.TOOL_USE,
-                    "tool": self.current_tool_use["tool_name"],
-                    "status": "started",
-                    "timestamp": self._get_timestamp()
-                }
-                
-        elif event_type == "content_block_delta":
-            delta = event.get("delta", {})
-            if delta.get("type") == "tool_use" and self.current_tool_use:
-                # Accumulate tool parameters
-                if "partial_json" in delta:
-                    # Handle partial JSON updates
-                    pass
-                    
-        elif event_type == "content_block_stop":
-            if self.current_tool_use:
-                tool_event = {
-                    "type": EventType.TOOL_USE,
-                    "tool": self.current_tool_use["tool_name"],
-                    "status": "completed",
-                    "timestamp": self._get_timestamp()
-                }
-                
-                # Track file changes
-                if self.current_tool_use["tool_name"] in ["Write", "Edit", "MultiEdit"]:
-                    self._track_file_change(self.current_tool_use)
-                    
-                self.current_tool_use = None
-                return tool_event
-                
-        elif event_type == "message_delta":
-            delta = event.get("delta", {})
-            if delta.get("stop_reason"):
-                return {
-                    "type": EventType.COMPLETION,
-                    "status": "completed",
-                    "reason": delta["stop_reason"],
-                    "file_changes": self.file_changes,
-                    "timestamp": self._get_timestamp()
-                }
+    def _process_json_event(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        handler = self._handlers.get(event.get("type", ""))
+        if handler is not None:
+            result = handler(event)
+            if result is not _UNHANDLED:
+                return result
                 
-        elif event_type == "error":
-            return {
-                "type": EventType.ERROR,
-                "error": event.get("error", {}),
-                "timestamp": self._get_timestamp()
-            }
-            
         # Default to output for unhandled events
         return {
             "type": EventType.OUTPUT,
             "data": event,
-            "timestamp": self._get_timestamp()
+            "timestamp": utc_timestamp()
+        }
+        
+    def _on_message_start(self, event: Dict[str, Any]):
+        return {
+            "type": EventType.PROGRESS,
+            "status": "started",
+            "message": "Claude is processing your request",
+            "timestamp": utc_timestamp()
+        }
+        
+    def _on_content_block_start(self, event: Dict[str, Any]):
+        content_block = event.get("content_block", {})
+        block_type = content_block.get("type")
+        if block_type != "tool_use":
+            return self._start_text_block(event.get("index", 0), block_type, content_block)
+            
+        tool_use = {
+            "tool_name": content_block.get("name", ""),
+            "tool_id": content_block.get("id", ""),
+            "parameters": content_block.get("input") or {},
+            "fragments": []
+        }
+        self.tool_blocks[event.get("index", 0)] = tool_use
+        return {
+            "type": EventType.TOOL_USE,
+            "tool": tool_use["tool_name"],
+            "tool_id": tool_use["tool_id"],
+            "status": "started",
+            "timestamp": utc_timestamp()
         }
         
+    def _on_content_block_delta(self, event: Dict[str, Any]):
+        delta = event.get("delta", {})
+        index = event.get("index", 0)
+        tool_use = self.tool_blocks.get(index)
+        if tool_use is None or "partial_json" not in delta:
+            return self._retain_delta(index, delta)
+            
+        # Accumulate tool parameters
+        tool_use["fragments"].append(delta["partial_json"])
+        return None
+        
+    def _on_content_block_stop(self, event: Dict[str, Any]):
+        index = event.get("index", 0)
+        tool_use = self.tool_blocks.pop(index, None)
+        if tool_use is None:
+            return self._finish_text_block(index)
+            
+        self._finish_tool_parameters(tool_use)
+        tool_event = {
+            "type": EventType.TOOL_USE,
+            "tool": tool_use["tool_name"],
+            "tool_id": tool_use["tool_id"],
+            "status": "completed",
+            "parameters": tool_use["parameters"],
+            "timestamp": utc_timestamp()
+        }
+        if "file_path" in tool_use["parameters"]:
+            tool_event["file_path"] = tool_use["parameters"]["file_path"]
+            
+        # Track file changes
+        if tool_use["tool_name"] in ["Write", "Edit", "MultiEdit"]:
+            self._track_file_change(tool_use)
+            
+        return tool_event
+        
+    def _on_message_delta(self, event: Dict[str, Any]):
+        delta = event.get("delta", {})
+        if not delta.get("stop_reason"):
+            return _UNHANDLED
+            
+        return {
+            "type": EventType.COMPLETION,
+            "status": "completed",
+            "reason": delta["stop_reason"],
+            "file_changes": self.file_changes,
+            "timestamp": utc_timestamp()
+        }
+        
+    def _on_ping(self, event: Dict[str, Any]):
+        if self.retention == "keep":
+            return _UNHANDLED
+        self.events_dropped += 1
+        return None
+        
+    def _on_error(self, event: Dict[str, Any]):
+        return {
+            "type": EventType.ERROR,
+            "error": event.get("error", {}),
+            "timestamp": utc_timestamp()
+        }
+        
+    def _start_text_block(self, index: int, block_type: Optional[str], content_block: Dict[str, Any]):
+        if self.retention == "keep" or block_type not in ("text", "thinking"):
+            return _UNHANDLED
+            
+        if self.retention == "aggregate":
+            self.text_blocks[index] = {
+                "block_type": block_type,
+                "parts": [content_block.get(block_type) or ""]
+            }
+        else:
+            self.events_dropped += 1
+        return None
+        
+    def _retain_delta(self, index: int, delta: Dict[str, Any]):
+        if self.retention == "keep":
+            return _UNHANDLED
+            
+        if self.retention == "aggregate":
+            block = self.text_blocks.get(index)
+            field = _TEXT_DELTA_FIELDS.get(delta.get("type"))
+            if block is not None and field:
+                block["parts"].append(delta.get(field) or "")
+                return None
+        elif self.retention == "sample":
+            self.deltas_seen += 1
+            if (self.deltas_seen - 1) % self.sample_every == 0:
+                return _UNHANDLED
+                
+        self.events_dropped += 1
+        return None
+        
+    def _finish_text_block(self, index: int):
+        if self.retention == "keep":
+            return _UNHANDLED
+            
+        block = self.text_blocks.pop(index, None)
+        if block is None:
+            # The stop of a dropped block carries nothing but its index
+            self.events_dropped += 1
+            return None
+            
+        return {
+            "type": EventType.MESSAGE,
+            "block_type": block["block_type"],
+            "text": "".join(block["parts"]),
+            "timestamp": utc_timestamp()
+        }
+        
+    def _finish_tool_parameters(self, tool_use: Dict[str, Any]):
+        fragments = tool_use.pop("fragments")
+        if not fragments:
+            return
+            
+        raw = "".join(fragments)
+        try:
+            parameters = _loads(raw)
+        except _DECODE_ERRORS as e:
+            logger.warning("Failed to parse tool parameters", tool=tool_use["tool_name"], error=str(e))
+            return
+            
+        if isinstance(parameters, dict):
+            tool_use["parameters"] = parameters
+            
     def _track_file_change(self, tool_use: Dict[str, Any]):
         tool_name = tool_use["tool_name"]
         params = tool_use.get("parameters", {})
@@ -132,12 +303,9 @@ class ClaudeOutputParser:
                 "tool": tool_name
             })
             
-    def _get_timestamp(self) -> str:
-        from datetime import datetime
-        return datetime.utcnow().isoformat() + "Z"
-        
     def get_summary(self) -> Dict[str, Any]:
         return {
             "files_changed": len(self.file_changes),
-            "changes": self.file_changes
-        }
\ No newline at end of file
+            "changes": self.file_changes,
+            "events_dropped": self.events_dropped
+        }
@@ -0,0 +1,43 @@
+import asyncio
+import signal
+from typing import Dict, Optional
+
+import structlog
+
+from agent.supervisor import kill_process_group
+
+logger = structlog.get_logger()
+
+
+async def run_git(*args: str, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> str:
+    # Own process group, so a cancelled step can take down git and its helpers together
+    proc = await asyncio.create_subprocess_exec(
+        "git", *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        start_new_session=True
+    )
+    
+    try:
+        stdout, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        # communicate() leaves the process running when cancelled
+        kill_process_group(proc.pid, signal.SIGKILL)
+        await proc.wait()
+        raise
+    
+    if proc.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {stderr.decode('utf-8', errors='replace').strip()}")
+        
+    return stdout.decode('utf-8', errors='replace')
+
+
+async def remote_head(url: str, env: Optional[Dict[str, str]] = None) -> str:
+    output = await run_git("ls-remote", url, "HEAD", env=env)
+    for line in output.splitlines():
+        sha, _, ref = line.partition("\t")
+        if ref == "HEAD":
+            return sha
+    raise RuntimeError("git ls-remote failed: remote has no HEAD")
@@ -1,28 +1,148 @@
+import asyncio
+import shutil
+import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Any, Awaitable, Callable, Dict, Optional
 
+import structlog
+from botocore.exceptions import BotoCoreError, ClientError
 from pydantic import BaseModel
+from redis import asyncio as aioredis
+
+from agent.aws import AWSClients
+from agent.claude_binary import resolve_claude_binary
+from agent.config import config
+from agent.lanes import load_lanes
+
+logger = structlog.get_logger()
+
+HEALTHY = "healthy"
+UNHEALTHY = "unhealthy"
 
 
 class HealthStatus(BaseModel):
     status: str
     timestamp: datetime
     version: str = "0.1.0"
-    checks: Dict[str, Any] = {}
+    ready: bool = False
+    services: Dict[str, Any] = {}
+    slots: Optional[Dict[str, int]] = None
+
+
+# Probes are cached for ttl seconds so frequent polling doesn't hammer Redis and SQS
+class HealthChecker:
+    def __init__(self, worker=None, ttl: Optional[float] = None, timeout: Optional[float] = None):
+        self.worker = worker
+        self.ttl = config.health_cache_ttl_seconds if ttl is None else ttl
+        self.timeout = config.health_probe_timeout_seconds if timeout is None else timeout
+        self._services: Optional[Dict[str, Dict[str, Any]]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def status(self) -> HealthStatus:
+        services = await self.services()
+        healthy = all(service["status"] == HEALTHY for service in services.values())
+        slots = self.slots()
+        return HealthStatus(
+            status=HEALTHY if healthy else UNHEALTHY,
+            timestamp=datetime.utcnow(),
+            ready=healthy and slots is not None and slots["busy"] < slots["total"],
+            services=services,
+            slots=slots
+        )
+
+    def slots(self) -> Optional[Dict[str, int]]:
+        if self.worker is None:
+            return None
+        return {"busy": self.worker.busy_slots, "total": self.worker.max_concurrent_tasks}
+
+    async def services(self) -> Dict[str, Dict[str, Any]]:
+        async with self._lock:
+            if self._services is None or time.monotonic() - self._checked_at >= self.ttl:
+                probes = {
+                    "redis": self._check_redis,
+                    "sqs": self._check_sqs,
+                    "disk": self._check_disk,
+                    "claude": self._check_claude,
+                }
+                results = await asyncio.gather(*(self._run_probe(name, probe) for name, probe in probes.items()))
+                self._services = dict(zip(probes, results))
+                self._checked_at = time.monotonic()
+            return self._services
 
+    async def _run_probe(self, name: str, probe: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(probe(), self.timeout)
+        except asyncio.TimeoutError:
+            result = {"status": UNHEALTHY, "detail": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"status": UNHEALTHY, "detail": str(e)}
+        result["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+        if result["status"] != HEALTHY:
+            logger.warning("Health probe failed", service=name, detail=result.get("detail"))
+        return result
 
-async def get_health_status() -> HealthStatus:
-    checks = {
-        "worker": "healthy",
-        "memory": "ok",
-        "connections": {
-            "sqs": "connected",
-            "redis": "connected"
+    async def _check_redis(self) -> Dict[str, Any]:
+        if not config.redis_url:
+            return {"status": HEALTHY, "detail": "not configured"}
+
+        client = self.worker.redis_client if self.worker else None
+        if client is not None:
+            await client.ping()
+            return {"status": HEALTHY}
+
+        # No worker connection to reuse (e.g. the initial connect failed)
+        client = aioredis.from_url(config.redis_url)
+        try:
+            await client.ping()
+        finally:
+            await client.close()
+        if self.worker is not None:
+            return {"status": UNHEALTHY, "detail": "reachable, but the worker is not connected"}
+        return {"status": HEALTHY}
+
+    async def _check_sqs(self) -> Dict[str, Any]:
+        lanes = self.worker.lanes if self.worker else load_lanes(config.sqs_lanes, config.sqs_queue_url)
+        lanes = [lane for lane in lanes if lane.queue_url]
+        if not lanes:
+            return {"status": HEALTHY, "detail": "not configured"}
+
+        aws = self.worker.aws_clients if self.worker else AWSClients()
+        try:
+            sqs = await aws.sqs()
+            responses = await asyncio.gather(*(
+                sqs.get_queue_attributes(
+                    QueueUrl=lane.queue_url,
+                    AttributeNames=["ApproximateNumberOfMessages"]
+                )
+                for lane in lanes
+            ))
+        except (BotoCoreError, ClientError) as e:
+            return {"status": UNHEALTHY, "detail": str(e)}
+        finally:
+            if self.worker is None:
+                await aws.close()
+
+        depths = {
+            lane.name: int(response.get("Attributes", {}).get("ApproximateNumberOfMessages", 0))
+            for lane, response in zip(lanes, responses)
         }
-    }
-    
-    return HealthStatus(
-        status="healthy",
-        timestamp=datetime.utcnow(),
-        checks=checks
-    )
\ No newline at end of file
+        return {"status": HEALTHY, "queue_depth": sum(depths.values()), "lanes": depths}
+
+    async def _check_disk(self) -> Dict[str, Any]:
+        usage = await asyncio.to_thread(shutil.disk_usage, config.session_base_dir)
+        free_percent = usage.free / usage.total * 100 if usage.total else 0.0
+        status = HEALTHY if free_percent >= config.health_min_free_disk_percent else UNHEALTHY
+        return {"status": status, "free_bytes": usage.free, "free_percent": round(free_percent, 1)}
+
+    async def _check_claude(self) -> Dict[str, Any]:
+        if self.worker is not None:
+            binary = self.worker.claude_wrapper.claude_binary
+        else:
+            binary = resolve_claude_binary(config.claude_binary)
+        # Presence only; the version was checked once at startup
+        path = shutil.which(binary)
+        if path is None:
+            return {"status": UNHEALTHY, "detail": f"{binary} not found"}
+        return {"status": HEALTHY, "path": path}
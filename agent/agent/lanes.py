@@ -0,0 +1,118 @@
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+import structlog
+from pydantic import BaseModel
+
+logger = structlog.get_logger()
+
+DEFAULT_LANE = "default"
+
+
+class Lane(BaseModel):
+    name: str
+    queue_url: str
+    weight: float = 1.0
+    # Most tasks from this lane running at once; defaults to every slot
+    max_concurrent: Optional[int] = None
+
+
+def load_lanes(raw: str, default_queue_url: Optional[str]) -> List[Lane]:
+    if not raw or not raw.strip():
+        return [Lane(name=DEFAULT_LANE, queue_url=default_queue_url or "")]
+
+    lanes = [Lane(**entry) for entry in json.loads(raw)]
+    names = [lane.name for lane in lanes]
+    if not lanes or len(set(names)) != len(names):
+        raise ValueError(f"SQS_LANES needs at least one lane and unique names, got {names}")
+    for lane in lanes:
+        if lane.weight <= 0:
+            raise ValueError(f"Lane {lane.name} needs a positive weight")
+    return lanes
+
+
+class _LaneState:
+    def __init__(self, lane: Lane, total: int):
+        self.lane = lane
+        self.cap = min(lane.max_concurrent or total, total)
+        self.running = 0
+        # Virtual time of the lane's next grant (start-time fair queuing)
+        self.vtime = 0.0
+        self.waiter: Optional[asyncio.Future] = None
+
+    @property
+    def waiting(self) -> bool:
+        return self.waiter is not None and not self.waiter.done()
+
+
+# Shares task slots between lanes by weight (start-time fair queuing), within each lane's cap
+class SlotScheduler:
+    def __init__(self, lanes: List[Lane], total: int):
+        self.total = total
+        self.free = total
+        self._vtime = 0.0
+        self._lanes: Dict[str, _LaneState] = {lane.name: _LaneState(lane, total) for lane in lanes}
+
+    def running(self, name: str) -> int:
+        return self._lanes[name].running
+
+    @property
+    def busy(self) -> int:
+        return self.total - self.free
+
+    def contended(self, name: str) -> bool:
+        # Whether another lane is waiting for a slot it could use
+        state = self._lanes[name]
+        return any(other.waiting and other.running < other.cap for other in self._lanes.values() if other is not state)
+
+    async def acquire(self, name: str):
+        state = self._lanes[name]
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiter = waiter
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we were cancelled
+                self.release(name)
+            raise
+        finally:
+            if state.waiter is waiter:
+                state.waiter = None
+
+    def claim_more(self, name: str, limit: int) -> int:
+        state = self._lanes[name]
+        claimed = 0
+        while claimed < limit and self._can_run(state) and not self.contended(name):
+            self._grant(state)
+            claimed += 1
+        return claimed
+
+    def release(self, name: str, count: int = 1):
+        if count <= 0:
+            return
+        state = self._lanes[name]
+        state.running -= count
+        self.free += count
+        self._dispatch()
+
+    def _can_run(self, state: _LaneState) -> bool:
+        return self.free > 0 and state.running < state.cap
+
+    def _dispatch(self):
+        while self.free > 0:
+            eligible = [s for s in self._lanes.values() if s.waiting and s.running < s.cap]
+            if not eligible:
+                return
+            state = min(eligible, key=lambda s: max(s.vtime, self._vtime))
+            self._grant(state)
+            state.waiter.set_result(None)
+
+    def _grant(self, state: _LaneState):
+        start = max(state.vtime, self._vtime)
+        self._vtime = start
+        state.vtime = start + 1.0 / state.lane.weight
+        state.running += 1
+        self.free -= 1
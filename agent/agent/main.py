@@ -7,10 +7,12 @@ from typing import AsyncIterator
 
 import structlog
 import uvicorn
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from agent.health import get_health_status, HealthStatus
+from agent.health import HealthChecker
 from agent.worker import AgentWorker
 from agent.config import config
 
@@ -21,6 +23,7 @@ logger = structlog.get_logger()
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     worker = AgentWorker()
     app.state.worker = worker
+    app.state.health = HealthChecker(worker)
     
     # Start worker
     worker_task = asyncio.create_task(worker.start())
@@ -44,9 +47,37 @@ app = FastAPI(
 )
 
 
+# Used when the app runs without its lifespan (no worker), e.g. in tests
+_default_health = HealthChecker()
+
+
+def _health_checker(request: Request) -> HealthChecker:
+    return getattr(request.app.state, "health", _default_health)
+
+
 @app.get("/health")
-async def health() -> HealthStatus:
-    return await get_health_status()
+async def health(request: Request) -> JSONResponse:
+    status = await _health_checker(request).status()
+    return JSONResponse(
+        content=jsonable_encoder(status),
+        status_code=200 if status.status == "healthy" else 503
+    )
+
+
+@app.get("/health/live")
+async def live() -> dict:
+    # The process and its event loop are responsive
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def ready(request: Request) -> JSONResponse:
+    # Not ready when a dependency is down or every task slot is busy
+    status = await _health_checker(request).status()
+    return JSONResponse(
+        content={"ready": status.ready, "status": status.status, "slots": status.slots},
+        status_code=200 if status.ready else 503
+    )
 
 
 @app.get("/metrics")
@@ -0,0 +1,170 @@
+from prometheus_client import Counter, Gauge, Histogram, Info
+
+# Task slot metrics
+TASK_SLOTS_TOTAL = Gauge(
+    "agent_task_slots_total",
+    "Number of concurrent task slots configured for this worker"
+)
+TASK_SLOTS_BUSY = Gauge(
+    "agent_task_slots_busy",
+    "Number of task slots currently running a task"
+)
+LANE_SLOTS_BUSY = Gauge(
+    "agent_lane_slots_busy",
+    "Number of task slots running a task from each lane",
+    ["lane"]
+)
+TASK_SLOT_WAIT_SECONDS = Histogram(
+    "agent_task_slot_wait_seconds",
+    "Time spent waiting for a free task slot before polling",
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600)
+)
+TASK_DURATION_SECONDS = Histogram(
+    "agent_task_duration_seconds",
+    "Time a message occupied a task slot",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+)
+TASKS_PROCESSED_TOTAL = Counter(
+    "agent_tasks_processed_total",
+    "Messages processed by task slots",
+    ["outcome"]
+)
+
+# Claude CLI self-check
+CLAUDE_CLI_INFO = Info(
+    "agent_claude_cli",
+    "Claude Code CLI found by the startup self-check"
+)
+CLAUDE_CLI_AVAILABLE = Gauge(
+    "agent_claude_cli_available",
+    "Whether the Claude Code CLI passed the startup self-check"
+)
+
+# Resource usage of the Claude process tree per task
+CLAUDE_WALL_SECONDS = Histogram(
+    "agent_claude_wall_seconds",
+    "Wall-clock time of the Claude process",
+    ["mode"],
+    buckets=(5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+)
+CLAUDE_CPU_SECONDS = Histogram(
+    "agent_claude_cpu_seconds",
+    "CPU time used by the Claude process tree",
+    ["mode"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 3600)
+)
+CLAUDE_PEAK_RSS_BYTES = Histogram(
+    "agent_claude_peak_rss_bytes",
+    "Peak resident memory of the Claude process tree",
+    ["mode"],
+    buckets=tuple(mb * 1024 * 1024 for mb in (128, 256, 512, 1024, 2048, 4096, 8192, 16384))
+)
+CLAUDE_DISK_BYTES = Histogram(
+    "agent_claude_disk_bytes",
+    "Bytes read from and written to storage by the Claude process tree",
+    ["mode", "direction"],
+    buckets=tuple(mb * 1024 * 1024 for mb in (1, 10, 100, 500, 1024, 5120, 10240, 51200))
+)
+
+# Queue intake
+SQS_RECEIVE_SECONDS = Histogram(
+    "agent_sqs_receive_seconds",
+    "Latency of ReceiveMessage calls, long polling included",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+)
+SQS_MESSAGES_RECEIVED_TOTAL = Counter(
+    "agent_sqs_messages_received_total",
+    "Task messages received from SQS"
+)
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "agent_task_queue_wait_seconds",
+    "Time from a task message being sent to being received by this worker",
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 3600)
+)
+
+# Workspace preparation
+WORKSPACE_PREPARE_SECONDS = Histogram(
+    "agent_workspace_prepare_seconds",
+    "Time to clone or check out the repository for a task",
+    ["backing"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+# Result cache
+RESULT_CACHE_LOOKUPS_TOTAL = Counter(
+    "agent_result_cache_lookups_total",
+    "Result cache lookups for read-only tasks, by outcome",
+    ["result"]
+)
+
+# Claude runs
+CLAUDE_PROCESSES_RUNNING = Gauge(
+    "agent_claude_processes_running",
+    "Claude processes currently running"
+)
+CLAUDE_FIRST_EVENT_SECONDS = Histogram(
+    "agent_claude_first_event_seconds",
+    "Time from starting the Claude process to its first output event",
+    ["mode"],
+    buckets=(0.5, 1, 2, 3, 5, 10, 20, 30, 60, 120)
+)
+CLAUDE_EVENTS_TOTAL = Counter(
+    "agent_claude_events_total",
+    "Events parsed from Claude output",
+    ["type"]
+)
+CLAUDE_EVENTS_PER_SECOND = Histogram(
+    "agent_claude_events_per_second",
+    "Average event rate of a Claude run",
+    ["mode"],
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+)
+
+# Status updates
+STATUS_SEND_SECONDS = Histogram(
+    "agent_status_send_seconds",
+    "Latency of SendMessageBatch calls carrying status updates",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+STATUS_UPDATES_TOTAL = Counter(
+    "agent_status_updates_total",
+    "Status updates sent to the result queue",
+    ["result"]
+)
+STATUS_UPDATES_PENDING = Gauge(
+    "agent_status_updates_pending",
+    "Status updates waiting to be sent"
+)
+VISIBILITY_LEASES_ACTIVE = Gauge(
+    "agent_visibility_leases_active",
+    "Messages whose visibility timeout is being extended"
+)
+
+# Artifacts
+ARTIFACT_UPLOAD_SECONDS = Histogram(
+    "agent_artifact_upload_seconds",
+    "Time to finish uploading a task's event log and summary",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+ARTIFACT_BYTES = Histogram(
+    "agent_artifact_bytes",
+    "Compressed size of a task's event log",
+    buckets=tuple(kb * 1024 for kb in (1, 10, 100, 1024, 10240, 102400, 1048576))
+)
+
+# Outcomes
+TASK_RETRIES_TOTAL = Counter(
+    "agent_task_retries_total",
+    "Tasks left on the queue to be retried",
+    ["cause"]
+)
+TASK_FAILURES_TOTAL = Counter(
+    "agent_task_failures_total",
+    "Tasks that failed permanently",
+    ["cause"]
+)
+TASK_COMPLETIONS_TOTAL = Counter(
+    "agent_task_completions_total",
+    "Tasks that completed successfully",
+    ["mode"]
+)
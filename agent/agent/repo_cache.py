@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import signal
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+
+from agent.git import run_git
+from agent.config import config
+from agent.supervisor import kill_process_group
+
+logger = structlog.get_logger()
+
+# How often using the cache also checks it against its size and age limits
+EVICT_INTERVAL_SECONDS = 300.0
+
+
+# Per-node bare mirrors that session checkouts borrow their objects from
+class RepositoryCache:
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        fetch_interval: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+        min_idle: Optional[float] = None
+    ):
+        self.base_dir = Path(base_dir or config.repo_cache_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.fetch_interval = config.repo_cache_fetch_interval_seconds if fetch_interval is None else fetch_interval
+        self.max_bytes = config.repo_cache_max_bytes if max_bytes is None else max_bytes
+        self.max_age = config.repo_cache_max_age_seconds if max_age is None else max_age
+        # Sessions borrow a mirror's objects for as long as they run, so recently used mirrors stay
+        self.min_idle = config.task_timeout_seconds if min_idle is None else min_idle
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._fetched_at: Dict[str, float] = {}
+        self._used_at: Dict[str, float] = {}
+        self._evicted_at = 0.0
+        self._evict_task: Optional[asyncio.Task] = None
+
+    def mirror_path(self, repo_url: str) -> Path:
+        normalized = repo_url.strip().rstrip("/")
+        if normalized.endswith(".git"):
+            normalized = normalized[:-4]
+        key = hashlib.sha256(normalized.lower().encode("utf-8")).hexdigest()[:20]
+        return self.base_dir / f"{key}.git"
+
+    async def ensure_mirror(self, repo_url: str, auth_url: str, env: Dict[str, str]) -> Path:
+        mirror = self.mirror_path(repo_url)
+        lock = self._locks.setdefault(str(mirror), asyncio.Lock())
+        self._used_at[str(mirror)] = time.time()
+
+        async with lock:
+            if (mirror / "HEAD").exists():
+                fetched_at = self._fetched_at.get(str(mirror), 0.0)
+                if time.monotonic() - fetched_at >= self.fetch_interval:
+                    # Fetch from the authenticated URL without storing it; mirrors made
+                    # before that kept the token in their remote, so reset it too
+                    await run_git("remote", "set-url", "origin", repo_url, cwd=str(mirror), env=env)
+                    await run_git(
+                        "fetch", "--prune", "--tags", "--quiet", auth_url, "+refs/heads/*:refs/heads/*",
+                        cwd=str(mirror), env=env
+                    )
+                    self._fetched_at[str(mirror)] = time.monotonic()
+                    logger.info("Refreshed repository mirror", repo=repo_url)
+                os.utime(mirror)
+            else:
+                await self._create_mirror(mirror, repo_url, auth_url, env)
+                self._fetched_at[str(mirror)] = time.monotonic()
+                logger.info("Created repository mirror", repo=repo_url, path=str(mirror))
+
+        # Sizing the cache walks every mirror, so it runs beside the task rather than in its way
+        idle_evictor = self._evict_task is None or self._evict_task.done()
+        if idle_evictor and time.monotonic() - self._evicted_at >= EVICT_INTERVAL_SECONDS:
+            self._evicted_at = time.monotonic()
+            self._evict_task = asyncio.create_task(self._evict_logged())
+        return mirror
+
+    async def _evict_logged(self):
+        try:
+            await self.evict()
+        except Exception as e:
+            logger.warning("Repository cache eviction failed", error=str(e))
+
+    async def evict(self):
+        # Drop mirrors unused for max_age, then least recently used ones while over max_bytes
+        usage = await asyncio.to_thread(self._usage)
+        total = sum(size for _, _, size in usage)
+        now = time.time()
+        for used_at, mirror, size in sorted(usage):
+            idle = now - used_at
+            if idle < self.min_idle or (idle < self.max_age and total <= self.max_bytes):
+                break
+            lock = self._locks.setdefault(str(mirror), asyncio.Lock())
+            async with lock:
+                # A task may have picked the mirror up while we were sizing the cache
+                if now - self._used_at.get(str(mirror), used_at) < self.min_idle:
+                    continue
+                await asyncio.to_thread(self._remove, mirror)
+            total -= size
+            logger.info("Evicted repository mirror", path=str(mirror), idle_seconds=int(idle), bytes=size)
+
+        if total > self.max_bytes:
+            logger.warning("Repository cache over budget, every mirror is in use", bytes=total, max_bytes=self.max_bytes)
+
+    def _usage(self) -> List[Tuple[float, Path, int]]:
+        usage = []
+        for mirror in self.base_dir.glob("*.git"):
+            try:
+                used_at = self._used_at.get(str(mirror)) or mirror.stat().st_mtime
+            except OSError:
+                continue
+            usage.append((used_at, mirror, _disk_usage(mirror) + _disk_usage(mirror.with_suffix(".checkout"))))
+        return usage
+
+    def _remove(self, mirror: Path):
+        shutil.rmtree(mirror.with_suffix(".checkout"), ignore_errors=True)
+        shutil.rmtree(mirror, ignore_errors=True)
+        self._used_at.pop(str(mirror), None)
+        self._fetched_at.pop(str(mirror), None)
+
+    async def clone(self, repo_url: str, auth_url: str, dest: Path, env: Dict[str, str]):
+        mirror = await self.ensure_mirror(repo_url, auth_url, env)
+
+        # Clone borrows the mirror's objects; point origin back at the real remote
+        await run_git("clone", "--shared", "--quiet", str(mirror), str(dest), env=env)
+        await run_git("remote", "set-url", "origin", auth_url, cwd=str(dest), env=env)
+
+    async def add_worktree(self, repo_url: str, auth_url: str, dest: Path, env: Dict[str, str]):
+        mirror = await self.ensure_mirror(repo_url, auth_url, env)
+        lock = self._locks[str(mirror)]
+
+        # Worktrees share the mirror's object store and config, so they are
+        # only suitable for sessions that never commit or push
+        async with lock:
+            await run_git("worktree", "prune", cwd=str(mirror), env=env)
+            await run_git("worktree", "add", "--detach", "--quiet", str(dest), "HEAD", cwd=str(mirror), env=env)
+
+    async def reflink_clone(self, repo_url: str, auth_url: str, dest: Path, env: Dict[str, str]):
+        mirror = await self.ensure_mirror(repo_url, auth_url, env)
+        template = mirror.with_suffix(".checkout")
+        lock = self._locks[str(mirror)]
+
+        async with lock:
+            # Keep one up-to-date checkout per repository as the copy source
+            if (template / ".git").exists():
+                await run_git("fetch", "--quiet", "origin", cwd=str(template), env=env)
+                await run_git("reset", "--hard", "--quiet", "origin/HEAD", cwd=str(template), env=env)
+                await run_git("clean", "-fdxq", cwd=str(template), env=env)
+            else:
+                await run_git("clone", "--shared", "--quiet", str(mirror), str(template), env=env)
+
+            # Copy-on-write where the filesystem supports it, plain copy otherwise
+            proc = await asyncio.create_subprocess_exec(
+                "cp", "-a", "--reflink=auto", str(template), str(dest),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                env=env,
+                start_new_session=True
+            )
+            try:
+                _, stderr = await proc.communicate()
+            except asyncio.CancelledError:
+                kill_process_group(proc.pid, signal.SIGKILL)
+                await proc.wait()
+                raise
+            if proc.returncode != 0:
+                raise RuntimeError(f"cp failed: {stderr.decode('utf-8', errors='replace').strip()}")
+
+        await run_git("remote", "set-url", "origin", auth_url, cwd=str(dest), env=env)
+
+    async def _create_mirror(self, mirror: Path, repo_url: str, auth_url: str, env: Dict[str, str]):
+        # Build in a temporary directory so a failed clone never leaves a half mirror
+        tmp_dir = self.base_dir / f".tmp-{uuid.uuid4().hex[:8]}"
+        try:
+            await run_git("clone", "--bare", "--quiet", auth_url, str(tmp_dir), env=env)
+            # Mirrors outlive tasks, so they keep the plain URL rather than the token
+            await run_git("remote", "set-url", "origin", repo_url, cwd=str(tmp_dir), env=env)
+            # Track branches only (skip provider refs such as refs/pull/*)
+            await run_git(
+                "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*",
+                cwd=str(tmp_dir), env=env
+            )
+            tmp_dir.rename(mirror)
+        finally:
+            if tmp_dir.exists():
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _disk_usage(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_blocks * 512
+            except OSError:
+                pass
+    return total
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+from agent.cgroups import SessionCgroup
+
+logger = structlog.get_logger()
+
+PROC_DIR = "/proc"
+
+try:
+    _CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _CLOCK_TICKS = 100
+    _PAGE_SIZE = 4096
+
+
+def _read_stat(pid: str) -> Optional[Tuple[int, int, float, int]]:
+    # Returns (session, starttime, cpu seconds, rss bytes) from /proc/<pid>/stat
+    try:
+        with open(f"{PROC_DIR}/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses; fields follow the last ')'
+    fields = data[data.rfind(b")") + 2:].split()
+    if len(fields) < 22:
+        return None
+    cpu = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    return int(fields[3]), int(fields[19]), cpu, int(fields[21]) * _PAGE_SIZE
+
+
+def _read_io(pid: str) -> Tuple[int, int]:
+    read_bytes = write_bytes = 0
+    try:
+        with open(f"{PROC_DIR}/{pid}/io", "rb") as f:
+            for line in f:
+                if line.startswith(b"read_bytes:"):
+                    read_bytes = int(line.split()[1])
+                elif line.startswith(b"write_bytes:"):
+                    write_bytes = int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return read_bytes, write_bytes
+
+
+# CPU, memory and disk I/O of the CLI's process tree, from its cgroup when it has one
+class ResourceMonitor:
+    def __init__(self, pid: int, interval: float = 1.0, cgroup: Optional[SessionCgroup] = None):
+        self.pid = pid
+        self.interval = interval
+        self.cgroup = cgroup
+        # The group may have run earlier commands (e.g. a warm pool install)
+        self._cgroup_baseline = cgroup.stats() if cgroup else {}
+        self.available = os.path.isdir(f"{PROC_DIR}/{pid}")
+        self.samples = 0
+        self.peak_rss_bytes = 0
+
+        # Last seen figures per process, keyed by (pid, start time) to survive pid reuse
+        self._cpu: Dict[Tuple[str, int], float] = {}
+        self._io: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        self._started = time.monotonic()
+        self._stopped: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.available:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> Dict[str, Any]:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+            # Catch whatever the tree did since the last tick
+            self.sample()
+        if self._stopped is None:
+            self._stopped = time.monotonic()
+        return self.usage()
+
+    async def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.debug("Resource sample failed", pid=self.pid, error=str(e))
+            await asyncio.sleep(self.interval)
+
+    def sample(self):
+        rss = 0
+        try:
+            entries = os.listdir(PROC_DIR)
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.isdigit():
+                continue
+            stat = _read_stat(entry)
+            if stat is None or stat[0] != self.pid:
+                continue
+            session, start_time, cpu, process_rss = stat
+            key = (entry, start_time)
+            self._cpu[key] = cpu
+            self._io[key] = _read_io(entry)
+            rss += process_rss
+
+        self.samples += 1
+        self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+
+    def usage(self) -> Dict[str, Any]:
+        end = self._stopped if self._stopped is not None else time.monotonic()
+        usage = {
+            "wall_seconds": round(end - self._started, 3),
+            "cpu_seconds": round(sum(self._cpu.values()), 3),
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "read_bytes": sum(r for r, _ in self._io.values()),
+            "write_bytes": sum(w for _, w in self._io.values()),
+            "processes": len(self._cpu),
+            "samples": self.samples,
+            "source": "proc"
+        }
+        if self.cgroup:
+            self._apply_cgroup_stats(usage)
+        return usage
+
+    def _apply_cgroup_stats(self, usage: Dict[str, Any]):
+        stats = self.cgroup.stats()
+        base = self._cgroup_baseline
+        if "cpu_usec" in stats:
+            usage["cpu_seconds"] = round((stats["cpu_usec"] - base.get("cpu_usec", 0)) / 1_000_000, 3)
+            usage["source"] = "cgroup"
+        if "memory_peak_bytes" in stats:
+            usage["peak_rss_bytes"] = max(usage["peak_rss_bytes"], stats["memory_peak_bytes"])
+        for key in ("read_bytes", "write_bytes"):
+            if key in stats:
+                usage[key] = stats[key] - base.get(key, 0)
+        # Metrics only need one observation; cgroup figures don't depend on sampling
+        usage["samples"] = max(usage["samples"], 1)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import time
+import unicodedata
+import zlib
+from typing import Any, Dict, List, Optional
+
+import structlog
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from agent.event_parser import EventType
+
+logger = structlog.get_logger()
+
+DEFAULT_PREFIX = "agent:result:"
+
+
+def normalize_prompt(prompt: str) -> str:
+    # Whitespace and Unicode form differences shouldn't miss the cache; case may matter in code
+    return " ".join(unicodedata.normalize("NFC", prompt).split())
+
+
+def cache_key(
+    repo_url: str,
+    commit: str,
+    mode: str,
+    prompt: str,
+    model: str,
+    max_turns: Optional[int] = None,
+    cli_version: Optional[str] = None
+) -> str:
+    # Every input that can change the result is part of the key
+    parts = {
+        "repo": repo_url.rstrip("/").removesuffix(".git"),
+        "commit": commit,
+        "mode": mode,
+        "prompt": normalize_prompt(prompt),
+        "model": model,
+        "max_turns": max_turns,
+        "cli": cli_version,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# Event streams of read-only runs in Redis; Redis errors count as misses and never fail a task
+class TaskResultCache:
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        ttl: int,
+        max_bytes: int,
+        max_entry_bytes: int,
+        prefix: str = DEFAULT_PREFIX
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.prefix = prefix
+        self._index = f"{prefix}index"
+        self._sizes = f"{prefix}sizes"
+        self._total = f"{prefix}bytes"
+
+    async def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            blob = await self.redis.get(self.prefix + key)
+        except RedisError as e:
+            logger.warning("Result cache lookup failed", error=str(e))
+            return None
+        if blob is None:
+            return None
+
+        try:
+            events = json.loads(zlib.decompress(blob))
+        except (zlib.error, ValueError) as e:
+            logger.warning("Discarding corrupt result cache entry", key=key, error=str(e))
+            await self._remove([key])
+            return None
+        for event in events:
+            event["type"] = EventType(event["type"])
+        return events
+
+    async def put(self, key: str, events: List[Dict[str, Any]]) -> bool:
+        blob = zlib.compress(json.dumps(events, default=str).encode("utf-8"))
+        if len(blob) > self.max_entry_bytes:
+            logger.debug("Result too large to cache", key=key, size=len(blob))
+            return False
+
+        try:
+            previous = await self.redis.hget(self._sizes, key)
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.set(self.prefix + key, blob, ex=self.ttl)
+                pipe.zadd(self._index, {key: time.time()})
+                pipe.hset(self._sizes, key, len(blob))
+                pipe.incrby(self._total, len(blob) - int(previous or 0))
+                await pipe.execute()
+            await self._evict()
+        except RedisError as e:
+            logger.warning("Failed to store result in cache", error=str(e))
+            return False
+        return True
+
+    async def _evict(self):
+        # Forget entries Redis has already expired, then drop the oldest ones
+        expired = await self.redis.zrangebyscore(self._index, "-inf", time.time() - self.ttl)
+        if expired:
+            await self._remove(expired)
+
+        total = int(await self.redis.get(self._total) or 0)
+        while total > self.max_bytes:
+            oldest = await self.redis.zrange(self._index, 0, 0)
+            if not oldest:
+                break
+            freed = await self._remove(oldest)
+            if freed is None:
+                break
+            total -= freed
+
+    async def _remove(self, keys: List[Any]) -> Optional[int]:
+        keys = [k.decode("utf-8") if isinstance(k, bytes) else k for k in keys]
+        try:
+            sizes = await self.redis.hmget(self._sizes, keys)
+            freed = sum(int(size or 0) for size in sizes)
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(*(self.prefix + k for k in keys))
+                pipe.zrem(self._index, *keys)
+                pipe.hdel(self._sizes, *keys)
+                pipe.decrby(self._total, freed)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Failed to evict result cache entries", error=str(e))
+            return None
+        return freed
@@ -0,0 +1,97 @@
+from typing import Any, Dict, List, Optional
+
+from agent.event_parser import EventType
+
+# Keep at most this many error messages in a summary
+MAX_SUMMARY_ERRORS = 50
+
+
+# Built one event at a time so the full event list never has to be kept
+class RunSummary:
+    def __init__(self):
+        self.total_events = 0
+        self.tool_counts: Dict[str, int] = {}
+        self.files_changed: List[Dict[str, Any]] = []
+        self.errors: List[Any] = []
+        self.error_count = 0
+        self.completion_event: Optional[Dict[str, Any]] = None
+        self.first_error_event: Optional[Dict[str, Any]] = None
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd: Optional[float] = None
+        self.num_turns: Optional[int] = None
+        self.resources: Optional[Dict[str, Any]] = None
+
+    @property
+    def error_occurred(self) -> bool:
+        return self.error_count > 0
+
+    @property
+    def completed(self) -> bool:
+        return self.completion_event is not None and not self.error_occurred
+
+    def add(self, event: Dict[str, Any]):
+        self.total_events += 1
+        event_type = event.get("type")
+
+        if event_type == EventType.TOOL_USE:
+            if event.get("status") == "completed":
+                tool = event.get("tool", "")
+                # dicts keep first-seen order, so tools_used stays stable
+                self.tool_counts[tool] = self.tool_counts.get(tool, 0) + 1
+
+        elif event_type == EventType.COMPLETION:
+            if self.completion_event is None:
+                self.completion_event = event
+            summary = event.get("summary", {})
+            self.files_changed = summary.get("changes", self.files_changed)
+            self.resources = summary.get("resources", self.resources)
+
+        elif event_type == EventType.ERROR:
+            self.error_count += 1
+            if self.first_error_event is None:
+                self.first_error_event = event
+            if len(self.errors) < MAX_SUMMARY_ERRORS:
+                self.errors.append(event.get("error", "Unknown error"))
+
+        elif event_type == EventType.OUTPUT:
+            self._add_usage(event.get("data"))
+
+    def _add_usage(self, data: Any):
+        if not isinstance(data, dict):
+            return
+
+        data_type = data.get("type")
+        if data_type == "result":
+            # Final stream-json result carries totals for the whole run
+            if data.get("total_cost_usd") is not None:
+                self.cost_usd = data["total_cost_usd"]
+            if data.get("num_turns") is not None:
+                self.num_turns = data["num_turns"]
+            usage = data.get("usage") or {}
+            if usage:
+                self.input_tokens = usage.get("input_tokens", self.input_tokens)
+                self.output_tokens = usage.get("output_tokens", self.output_tokens)
+
+        elif data_type == "assistant":
+            # Per-message usage, superseded by the result totals when they arrive
+            usage = (data.get("message") or {}).get("usage") or {}
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_events": self.total_events,
+            "tools_used": list(self.tool_counts),
+            "tool_counts": dict(self.tool_counts),
+            "files_changed": self.files_changed,
+            "errors": list(self.errors),
+            "error_count": self.error_count,
+            "usage": {
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "cost_usd": self.cost_usd,
+                "num_turns": self.num_turns
+            },
+            "resources": self.resources
+        }
@@ -1,21 +1,176 @@
 import os
+import queue
+import re
+import threading
+import time
 import uuid
 import tempfile
 import shutil
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 import structlog
 
+from agent.cgroups import CgroupManager, SessionCgroup
 from agent.config import config
 
 logger = structlog.get_logger()
 
 
+# How a session's repository checkout is materialized from the repository cache
+WORKSPACE_BACKINGS = ("clone", "worktree", "reflink")
+
+# Directory under the session base dir holding renamed sessions awaiting deletion
+TRASH_DIR_NAME = ".trash"
+
+# Session directories are named "<task id>-<8 hex chars>"; nothing else in the base dir is ours
+SESSION_DIR_PATTERN = re.compile(r".+-[0-9a-f]{8}")
+
+
+# Renames finished sessions into a trash dir and deletes them on a background thread
+class SessionReaper:
+    def __init__(
+        self,
+        base_dir: Path,
+        retention_seconds: float = 0,
+        high_water_percent: float = 90.0,
+        throttle_seconds: float = 0.0,
+        check_interval: float = 5.0
+    ):
+        self.base_dir = base_dir
+        self.trash_dir = base_dir / TRASH_DIR_NAME
+        self.trash_dir.mkdir(parents=True, exist_ok=True)
+        self.retention_seconds = retention_seconds
+        self.high_water_percent = high_water_percent
+        self.throttle_seconds = throttle_seconds
+        self.check_interval = check_interval
+        
+        self._queue: "queue.Queue[Optional[Path]]" = queue.Queue()
+        self._retained: "OrderedDict[Path, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="session-reaper", daemon=True)
+        self._thread.start()
+        
+    def delete(self, path: Path):
+        with self._lock:
+            self._retained.pop(path, None)
+        trashed = self._move_to_trash(path)
+        if trashed:
+            self._queue.put(trashed)
+            
+    def finish(self, path: Path):
+        if self.retention_seconds > 0:
+            with self._lock:
+                self._retained[path] = time.monotonic()
+        else:
+            self.delete(path)
+            
+    def sweep(self, keep: Optional[set] = None):
+        # Anything left in the base dir at startup belongs to a previous process
+        keep = keep or set()
+        for entry in self.base_dir.iterdir():
+            if SESSION_DIR_PATTERN.fullmatch(entry.name) and entry.name not in keep and entry.is_dir():
+                logger.info("Removing orphaned session directory", path=str(entry))
+                self.delete(entry)
+        for entry in self.trash_dir.iterdir():
+            self._queue.put(entry)
+            
+    def close(self, timeout: float = 5.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+        
+    def disk_usage_percent(self) -> float:
+        usage = shutil.disk_usage(self.base_dir)
+        return usage.used / usage.total * 100 if usage.total else 0.0
+        
+    def _move_to_trash(self, path: Path) -> Optional[Path]:
+        if not path.exists():
+            return None
+        target = self.trash_dir / f"{path.name}-{uuid.uuid4().hex[:8]}"
+        try:
+            path.rename(target)
+            return target
+        except OSError as e:
+            # Different filesystem or already gone; delete in place instead
+            logger.warning("Failed to move session to trash", path=str(path), error=str(e))
+            return path if path.exists() else None
+            
+    def _run(self):
+        while True:
+            try:
+                path = self._queue.get(timeout=self.check_interval)
+            except queue.Empty:
+                path = False
+                
+            if path is None:
+                return
+            if path:
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info("Deleted session directory", path=str(path))
+                if self.throttle_seconds:
+                    time.sleep(self.throttle_seconds)
+                    
+            try:
+                self._evict()
+            except Exception as e:
+                logger.error("Session eviction failed", error=str(e))
+                
+    def _evict(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [p for p, finished in self._retained.items() if now - finished >= self.retention_seconds]
+        for path in expired:
+            self.delete(path)
+            
+        # Under disk pressure, evict retained sessions oldest first
+        while self._retained and self.disk_usage_percent() >= self.high_water_percent:
+            with self._lock:
+                path, _ = self._retained.popitem(last=False)
+            logger.warning("Evicting finished session under disk pressure", path=str(path))
+            trashed = self._move_to_trash(path)
+            if trashed:
+                shutil.rmtree(trashed, ignore_errors=True)
+
+
 class SessionManager:
-    def __init__(self, base_dir: Optional[str] = None):
+    def __init__(self, base_dir: Optional[str] = None, backing: Optional[str] = None):
         self.base_dir = Path(base_dir or config.session_base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
+        self.backing = backing or config.workspace_backing
+        if self.backing not in WORKSPACE_BACKINGS:
+            logger.warning("Unknown workspace backing, using clone", backing=self.backing)
+            self.backing = "clone"
+            
+        # Background deletion of finished sessions, starting with leftovers from a previous run
+        self.reaper = SessionReaper(
+            self.base_dir,
+            retention_seconds=config.session_retention_seconds,
+            high_water_percent=config.session_disk_high_water_percent,
+            throttle_seconds=config.session_cleanup_throttle_seconds
+        )
+        self.reaper.sweep()
+        
+        # Optional per-session cgroup limits so concurrent tasks can't starve each other
+        self.cgroups: Optional[CgroupManager] = None
+        if config.session_cgroups_enabled:
+            self.cgroups = CgroupManager(
+                config.session_cgroup_root,
+                cpu_weight=config.session_cpu_weight,
+                memory_max=config.session_memory_max_bytes,
+                pids_max=config.session_pids_max
+            )
+            
+    def close(self):
+        self.reaper.close()
+        
+    def backing_for(self, read_only: bool) -> str:
+        # Worktrees share the cached mirror's refs and config, so sessions that
+        # commit and push always get their own clone
+        if self.backing == "worktree" and not read_only:
+            return "clone"
+        return self.backing
+        
     def create_session(self, task_id: str, repository_url: str) -> 'Session':
         session_id = f"{task_id}-{uuid.uuid4().hex[:8]}"
         session_dir = self.base_dir / session_id
@@ -25,24 +180,37 @@ class SessionManager:
             session_id=session_id,
             task_id=task_id,
             session_dir=session_dir,
-            repository_url=repository_url
+            repository_url=repository_url,
+            cgroup=self.cgroups.create(session_id) if self.cgroups else None
         )
         
     def cleanup_session(self, session: 'Session'):
+        # Rename now, delete on the reaper thread
+        if session.cgroup:
+            session.cgroup.remove()
+            
         try:
-            if session.session_dir.exists():
-                shutil.rmtree(session.session_dir)
-                logger.info("Cleaned up session", session_id=session.session_id)
+            self.reaper.finish(session.session_dir)
+            logger.info("Cleaned up session", session_id=session.session_id)
         except Exception as e:
             logger.error("Failed to cleanup session", session_id=session.session_id, error=str(e))
 
 
 class Session:
-    def __init__(self, session_id: str, task_id: str, session_dir: Path, repository_url: str):
+    def __init__(
+        self,
+        session_id: str,
+        task_id: str,
+        session_dir: Path,
+        repository_url: str,
+        cgroup: Optional[SessionCgroup] = None
+    ):
         self.session_id = session_id
         self.task_id = task_id
         self.session_dir = session_dir
         self.repository_url = repository_url
+        self.backing = "clone"
+        self.cgroup = cgroup
         
         # Create subdirectories
         self.workspace_dir = session_dir / "workspace"
@@ -56,6 +224,10 @@ class Session:
     def repo_dir(self) -> Path:
         return self.workspace_dir / "repo"
         
+    def command(self, argv: List[str]) -> List[str]:
+        # Command line that starts argv inside the session's cgroup
+        return self.cgroup.wrap_command(argv) if self.cgroup else argv
+        
     def get_env(self) -> Dict[str, str]:
         env = os.environ.copy()
         env.update({
@@ -0,0 +1,108 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import structlog
+
+from agent.git import run_git
+from agent.session import Session, SessionManager
+
+logger = structlog.get_logger()
+
+
+def _pool_key(repo_url: str) -> str:
+    key = repo_url.strip().rstrip("/")
+    if key.endswith(".git"):
+        key = key[:-4]
+    return key.lower()
+
+
+# Pre-cloned workspaces for hot repositories, refilled in the background
+class WarmSessionPool:
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        prepare: Callable[[Session], Awaitable[None]],
+        repositories: List[str],
+        size: int
+    ):
+        self.session_manager = session_manager
+        self.prepare = prepare
+        self.size = size
+        self.repositories = {_pool_key(url): url for url in repositories if url.strip()}
+        self._ready: Dict[str, List[Session]] = {key: [] for key in self.repositories}
+        self._fillers: Dict[str, asyncio.Task] = {}
+        self._running = False
+
+    async def start(self):
+        self._running = True
+        for key in self.repositories:
+            self._replenish(key)
+        logger.info("Started warm session pool", repositories=list(self.repositories.values()), size=self.size)
+
+    async def stop(self):
+        self._running = False
+        for task in self._fillers.values():
+            task.cancel()
+        await asyncio.gather(*self._fillers.values(), return_exceptions=True)
+        self._fillers.clear()
+
+        for sessions in self._ready.values():
+            for session in sessions:
+                self.session_manager.cleanup_session(session)
+            sessions.clear()
+
+    def ready_count(self, repo_url: str) -> int:
+        return len(self._ready.get(_pool_key(repo_url), []))
+
+    async def acquire(self, task_id: str, repo_url: str) -> Optional[Session]:
+        key = _pool_key(repo_url)
+        sessions = self._ready.get(key)
+        if not sessions:
+            return None
+
+        session = sessions.pop(0)
+        self._replenish(key)
+
+        try:
+            # Bring the pre-cloned workspace up to date with the remote default branch
+            env = session.get_env()
+            repo_dir = str(session.repo_dir)
+            await run_git("fetch", "--quiet", "origin", cwd=repo_dir, env=env)
+            await run_git("reset", "--hard", "--quiet", "origin/HEAD", cwd=repo_dir, env=env)
+        except RuntimeError as e:
+            logger.warning("Discarding stale warm session", session_id=session.session_id, error=str(e))
+            self.session_manager.cleanup_session(session)
+            return None
+        except asyncio.CancelledError:
+            # The task timed out or was cancelled mid-refresh; the session is in an unknown state
+            self.session_manager.cleanup_session(session)
+            raise
+
+        session.task_id = task_id
+        logger.info("Using warm session", task_id=task_id, session_id=session.session_id)
+        return session
+
+    def _replenish(self, key: str):
+        if not self._running:
+            return
+        filler = self._fillers.get(key)
+        if filler is None or filler.done():
+            self._fillers[key] = asyncio.create_task(self._fill(key))
+
+    async def _fill(self, key: str):
+        repo_url = self.repositories[key]
+        sessions = self._ready[key]
+
+        while self._running and len(sessions) < self.size:
+            session = self.session_manager.create_session("warm", repo_url)
+            try:
+                await self.prepare(session)
+            except asyncio.CancelledError:
+                self.session_manager.cleanup_session(session)
+                raise
+            except Exception as e:
+                logger.error("Failed to prepare warm session", repo=repo_url, error=str(e))
+                self.session_manager.cleanup_session(session)
+                return
+            sessions.append(session)
+            logger.info("Warm session ready", repo=repo_url, ready=len(sessions))
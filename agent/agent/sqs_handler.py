@@ -1,88 +1,123 @@
 import asyncio
 import json
 import os
+import time
 from typing import Dict, Any, Optional
-import boto3
 from botocore.exceptions import ClientError
 import structlog
 
+from agent.artifacts import ArtifactStream
+from agent.aws import AWSClients
 from agent.claude_code import ClaudeCodeWrapper
+from agent.error_classifier import Classification, ErrorClassifier
 from agent.event_parser import EventType
+from agent.run_summary import RunSummary
+from agent.visibility import VisibilityHeartbeat
+from agent.status_publisher import StatusPublisher
+from agent.supervisor import STOP_CANCELLED
 from agent.config import config
+from agent.metrics import (
+    ARTIFACT_BYTES,
+    ARTIFACT_UPLOAD_SECONDS,
+    SQS_MESSAGES_RECEIVED_TOTAL,
+    SQS_RECEIVE_SECONDS,
+    STATUS_SEND_SECONDS,
+    STATUS_UPDATES_PENDING,
+    STATUS_UPDATES_TOTAL,
+    TASK_COMPLETIONS_TOTAL,
+    TASK_FAILURES_TOTAL,
+    TASK_QUEUE_WAIT_SECONDS,
+    TASK_RETRIES_TOTAL,
+    VISIBILITY_LEASES_ACTIVE,
+)
 
 logger = structlog.get_logger()
 
 
 class SQSTaskHandler:
-    def __init__(self, claude_wrapper: ClaudeCodeWrapper):
+    def __init__(self, claude_wrapper: ClaudeCodeWrapper, aws_clients: Optional[AWSClients] = None):
         self.claude_wrapper = claude_wrapper
         self.queue_url = config.sqs_queue_url or ""
         self.result_queue_url = config.sqs_result_queue_url or ""
         self.s3_bucket = config.s3_bucket_name
         
-        # Initialize AWS clients
-        self.sqs = self._create_sqs_client(config.aws_endpoint_url)
-        self.s3 = self._create_s3_client(config.aws_endpoint_url)
+        # Queue each in-flight message came from, by receipt handle (lanes use several queues)
+        self._message_queues: Dict[str, str] = {}
         
-    def _create_sqs_client(self, endpoint_url: Optional[str]):
-        if endpoint_url:
-            # LocalStack or custom endpoint
-            return boto3.client(
-                'sqs',
-                endpoint_url=endpoint_url,
-                region_name=config.aws_region,
-                aws_access_key_id=config.aws_access_key_id or "test",
-                aws_secret_access_key=config.aws_secret_access_key or "test"
-            )
-        else:
-            # Real AWS
-            return boto3.client('sqs')
-            
-    def _create_s3_client(self, endpoint_url: Optional[str]):
-        if endpoint_url:
-            # LocalStack or custom endpoint
-            return boto3.client(
-                's3',
-                endpoint_url=endpoint_url,
-                region_name=config.aws_region,
-                aws_access_key_id=config.aws_access_key_id or "test",
-                aws_secret_access_key=config.aws_secret_access_key or "test"
-            )
-        else:
-            # Real AWS
-            return boto3.client('s3')
-            
-    async def receive_messages(self, max_messages: int = 1, wait_time_seconds: int = 20) -> list:
-        if not self.queue_url:
+        # Shared async AWS clients
+        self.aws = aws_clients or AWSClients()
+        
+        # Extend visibility of in-flight messages so long tasks aren't redelivered
+        self.heartbeat = VisibilityHeartbeat(
+            self._change_message_visibility,
+            visibility_timeout=config.sqs_visibility_timeout_seconds,
+            max_extension=config.sqs_visibility_max_extension_seconds,
+            # Leave one visibility period after the task timeout for reporting and cleanup
+            max_lease=config.task_timeout_seconds + config.sqs_visibility_timeout_seconds
+        )
+        
+        # Decides which failures are retried and how long to wait first
+        self.error_classifier = ErrorClassifier(
+            config.retry_backoff_base_seconds,
+            config.retry_backoff_max_seconds
+        )
+        
+        # Batch and coalesce status updates sent to the result queue
+        self.status_publisher = StatusPublisher(
+            self._send_status_batch,
+            batch_size=config.status_batch_size,
+            flush_interval=config.status_flush_interval_seconds
+        )
+        
+        VISIBILITY_LEASES_ACTIVE.set_function(lambda: self.heartbeat.in_flight)
+        STATUS_UPDATES_PENDING.set_function(lambda: self.status_publisher.pending_count)
+        
+    async def receive_messages(self, max_messages: int = 1, wait_time_seconds: int = 20, queue_url: Optional[str] = None) -> list:
+        queue_url = queue_url or self.queue_url
+        if not queue_url:
             logger.warning("No SQS queue URL configured")
             return []
             
-        try:
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.sqs.receive_message(
-                    QueueUrl=self.queue_url,
-                    MaxNumberOfMessages=max_messages,
-                    WaitTimeSeconds=wait_time_seconds,
-                    MessageAttributeNames=['All']
-                )
-            )
-            return response.get('Messages', [])
-        except ClientError as e:
-            logger.error("Failed to receive SQS messages", error=str(e))
-            return []
-            
-    async def process_message(self, message: Dict[str, Any]):
+        # Errors propagate so the worker can back off
+        sqs = await self.aws.sqs()
+        started = time.monotonic()
+        response = await sqs.receive_message(
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=max_messages,
+            WaitTimeSeconds=wait_time_seconds,
+            VisibilityTimeout=config.sqs_visibility_timeout_seconds,
+            AttributeNames=['ApproximateReceiveCount', 'SentTimestamp'],
+            MessageAttributeNames=['All']
+        )
+        SQS_RECEIVE_SECONDS.observe(time.monotonic() - started)
+        
+        messages = response.get('Messages', [])
+        SQS_MESSAGES_RECEIVED_TOTAL.inc(len(messages))
+        now_ms = time.time() * 1000
+        for message in messages:
+            sent_ms = message.get('Attributes', {}).get('SentTimestamp')
+            if sent_ms:
+                TASK_QUEUE_WAIT_SECONDS.observe(max(0.0, now_ms - int(sent_ms)) / 1000)
+        return messages
+        
+    async def process_message(self, message: Dict[str, Any], queue_url: Optional[str] = None):
         receipt_handle = message.get('ReceiptHandle')
-        retry_count = int(message.get('Attributes', {}).get('ApproximateReceiveCount', '0'))
+        if receipt_handle:
+            self._message_queues[receipt_handle] = queue_url or self.queue_url
+        # SQS counts the first delivery as 1; retry_count is the number of earlier attempts
+        retry_count = max(0, int(message.get('Attributes', {}).get('ApproximateReceiveCount', '1')) - 1)
         max_retries = config.max_task_retries
         
         task_id = 'unknown'
+        mode = 'unknown'
+        
+        self.heartbeat.start(receipt_handle)
         
         try:
             # Parse task from message body
             task = json.loads(message['Body'])
             task_id = task.get('id', 'unknown')
+            mode = task.get('mode', 'write')
             
             logger.info("Processing task", task_id=task_id, retry_count=retry_count)
             
@@ -93,39 +128,47 @@ class SQSTaskHandler:
                     "error": f"Task failed after {retry_count} attempts",
                     "message": "Task exceeded retry limit"
                 })
+                TASK_FAILURES_TOTAL.labels(cause="retry_limit").inc()
                 # Delete message to prevent further retries
                 await self._delete_message(receipt_handle)
                 return
-            
+                
             # Send initial status update
             await self._send_status_update(task_id, "PROCESSING", {
                 "message": f"Task processing started (attempt {retry_count + 1})"
             })
             
-            # Process task with Claude
-            events = []
-            error_occurred = False
+            # Process task with Claude, streaming events to S3 as they arrive
+            run_summary = RunSummary()
+            artifacts = ArtifactStream(
+                self.aws,
+                self.s3_bucket,
+                f"tasks/{task_id}/events.ndjson.gz",
+                part_size=config.artifact_part_size_bytes
+            )
             
-            async for event in self.claude_wrapper.execute_task(task):
-                events.append(event)
-                
-                # Send progress updates for significant events
-                if event["type"] in [EventType.PROGRESS, EventType.TOOL_USE]:
-                    await self._send_status_update(task_id, "PROCESSING", {
-                        "progress": event
-                    })
-                elif event["type"] == EventType.ERROR:
-                    error_occurred = True
+            try:
+                async for event in self.claude_wrapper.execute_task(task):
+                    run_summary.add(event)
+                    await artifacts.write(event)
                     
+                    # Send progress updates for significant events
+                    if event["type"] in [EventType.PROGRESS, EventType.TOOL_USE]:
+                        # Tool parameters may hold whole files; they only go to the artifact log
+                        progress = {k: v for k, v in event.items() if k != "parameters"}
+                        await self._send_status_update(task_id, "PROCESSING", {
+                            "progress": progress
+                        })
+            except BaseException:
+                await artifacts.abort()
+                raise
+                
             # Check if task completed successfully
-            completion_event = next(
-                (e for e in events if e["type"] == EventType.COMPLETION),
-                None
-            )
+            completion_event = run_summary.completion_event
             
-            if completion_event and not error_occurred:
+            if run_summary.completed:
                 # Save artifacts to S3
-                artifact_url = await self._save_artifacts(task_id, events)
+                artifact_url = await self._save_artifacts(task_id, artifacts, run_summary)
                 
                 # Send completion status
                 await self._send_status_update(task_id, "COMPLETED", {
@@ -134,85 +177,186 @@ class SQSTaskHandler:
                     "message": "Task completed successfully"
                 })
                 
+                TASK_COMPLETIONS_TOTAL.labels(mode=mode).inc()
+                
                 # Delete message from queue
                 await self._delete_message(receipt_handle)
             else:
-                # Task failed
-                error_event = next(
-                    (e for e in events if e["type"] == EventType.ERROR),
-                    None
-                )
-                
-                error_msg = error_event.get("error", "Unknown error") if error_event else "Task did not complete"
+                # Task failed, discard the partial event log
+                await artifacts.abort()
                 
-                # Check if error is retryable
-                retryable_errors = [
-                    "rate limit",
-                    "timeout",
-                    "connection",
-                    "network",
-                    "temporary"
-                ]
+                error_event = run_summary.first_error_event
                 
-                is_retryable = any(err in error_msg.lower() for err in retryable_errors)
+                error_msg = error_event.get("error", "Unknown error") if error_event else "Task did not complete"
+                stop_reason = error_event.get("reason") if error_event else None
+                classification = self.error_classifier.classify(error_event, attempt=retry_count + 1)
                 
-                if is_retryable and retry_count < max_retries:
-                    # Don't delete message - let it retry
-                    logger.warning("Retryable error occurred", task_id=task_id, error=error_msg)
+                if stop_reason == STOP_CANCELLED:
+                    logger.info("Task cancelled", task_id=task_id)
+                    await self._send_status_update(task_id, "CANCELLED", {
+                        "error": error_msg,
+                        "message": "Task was cancelled"
+                    })
+                    TASK_FAILURES_TOTAL.labels(cause=classification.cause).inc()
+                    await self._delete_message(receipt_handle)
+                    return
+                    
+                if classification.retryable and retry_count < max_retries:
+                    # Don't delete message - hide it for the backoff delay and let it retry
+                    logger.warning(
+                        "Retryable error occurred",
+                        task_id=task_id,
+                        error=error_msg,
+                        cause=classification.cause,
+                        retry_in=classification.delay_seconds
+                    )
+                    TASK_RETRIES_TOTAL.labels(cause=classification.cause).inc()
                     await self._send_status_update(task_id, "RETRYING", {
                         "error": error_msg,
+                        "cause": classification.cause,
                         "retry_count": retry_count + 1,
+                        "retry_in_seconds": classification.delay_seconds,
                         "message": f"Task will be retried (attempt {retry_count + 2})"
                     })
+                    await self._delay_retry(receipt_handle, classification.delay_seconds)
                 else:
                     # Non-retryable error or exceeded retries
                     await self._send_status_update(task_id, "FAILED", {
                         "error": error_msg,
+                        "cause": classification.cause,
                         "message": "Task failed permanently"
                     })
+                    TASK_FAILURES_TOTAL.labels(cause=classification.cause).inc()
                     # Delete message to prevent further retries
                     await self._delete_message(receipt_handle)
                     
+        except asyncio.CancelledError:
+            # Worker shutting down: hand the message straight back instead of waiting out its lease
+            await self._delay_retry(receipt_handle, 0)
+            raise
+            
         except json.JSONDecodeError as e:
             logger.error("Invalid message format", error=str(e))
+            TASK_FAILURES_TOTAL.labels(cause="invalid_message").inc()
             # Delete malformed message
             await self._delete_message(receipt_handle)
             
         except Exception as e:
             logger.error("Failed to process message", task_id=task_id, error=str(e))
             
-            # Try to update task status
-            try:
-                await self._send_status_update(task_id, "FAILED", {
-                    "error": str(e),
-                    "message": "Task processing failed"
-                })
-            except:
-                pass
+            classification = self.error_classifier.classify({"error": str(e)}, attempt=retry_count + 1)
+            if classification.cause == "task_error":
+                # Unrecognised exceptions are usually on our side (S3, Redis, the host), not the task's
+                classification = Classification(True, "exception", self.error_classifier.delay(retry_count + 1, str(e)))
                 
             # Check if we should retry
-            if retry_count < max_retries:
-                # Don't delete message - let it retry
-                logger.info("Message will be retried", task_id=task_id, retry_count=retry_count)
+            if classification.retryable and retry_count < max_retries:
+                logger.info(
+                    "Message will be retried",
+                    task_id=task_id,
+                    retry_count=retry_count,
+                    cause=classification.cause,
+                    retry_in=classification.delay_seconds
+                )
+                TASK_RETRIES_TOTAL.labels(cause=classification.cause).inc()
+                try:
+                    await self._send_status_update(task_id, "RETRYING", {
+                        "error": str(e),
+                        "cause": classification.cause,
+                        "retry_count": retry_count + 1,
+                        "retry_in_seconds": classification.delay_seconds,
+                        "message": f"Task will be retried (attempt {retry_count + 2})"
+                    })
+                except:
+                    pass
+                # Hide it for the backoff delay rather than whatever lease the heartbeat last set
+                await self._delay_retry(receipt_handle, classification.delay_seconds)
             else:
-                # Delete message after max retries
+                try:
+                    await self._send_status_update(task_id, "FAILED", {
+                        "error": str(e),
+                        "cause": classification.cause,
+                        "message": "Task processing failed"
+                    })
+                except:
+                    pass
+                TASK_FAILURES_TOTAL.labels(cause=classification.cause).inc()
+                # Delete message to prevent further retries
                 await self._delete_message(receipt_handle)
+                
+        finally:
+            # Stop extending; a message left on the queue becomes visible for retry
+            await self.heartbeat.stop(receipt_handle)
+            self._message_queues.pop(receipt_handle, None)
             
-    async def _delete_message(self, receipt_handle: str):
-        if not self.queue_url or not receipt_handle:
+    async def return_messages(self, messages: list, queue_url: Optional[str] = None):
+        # Make messages we won't run visible again right away
+        entries = [
+            {"Id": str(i), "ReceiptHandle": message["ReceiptHandle"], "VisibilityTimeout": 0}
+            for i, message in enumerate(messages)
+            if message.get("ReceiptHandle")
+        ]
+        if not entries:
             return
             
+        sqs = await self.aws.sqs()
         try:
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.sqs.delete_message(
-                    QueueUrl=self.queue_url,
-                    ReceiptHandle=receipt_handle
+            # SQS batches hold at most 10 entries
+            for start in range(0, len(entries), 10):
+                response = await sqs.change_message_visibility_batch(
+                    QueueUrl=queue_url or self.queue_url,
+                    Entries=entries[start:start + 10]
                 )
+                if response.get('Failed'):
+                    logger.warning("Failed to return some messages", failed=len(response['Failed']))
+        except ClientError as e:
+            # They still come back once their visibility timeout runs out
+            logger.warning("Failed to return messages", error=str(e))
+            
+    async def close(self):
+        await self.heartbeat.close()
+        await self.status_publisher.close()
+        
+    async def _change_message_visibility(self, receipt_handle: str, timeout: int):
+        sqs = await self.aws.sqs()
+        await sqs.change_message_visibility(
+            QueueUrl=self._queue_for(receipt_handle),
+            ReceiptHandle=receipt_handle,
+            VisibilityTimeout=timeout
+        )
+        
+    async def _delay_retry(self, receipt_handle: Optional[str], delay_seconds: int):
+        if not receipt_handle:
+            return
+            
+        # The heartbeat would otherwise keep pushing the visibility out
+        await self.heartbeat.stop(receipt_handle)
+        
+        try:
+            await self._change_message_visibility(receipt_handle, delay_seconds)
+        except ClientError as e:
+            # The message still comes back once its current visibility timeout runs out
+            logger.warning("Failed to set retry delay", error=str(e))
+            
+    async def _delete_message(self, receipt_handle: str):
+        queue_url = self._queue_for(receipt_handle)
+        if not queue_url or not receipt_handle:
+            return
+            
+        await self.heartbeat.stop(receipt_handle)
+        
+        try:
+            sqs = await self.aws.sqs()
+            await sqs.delete_message(
+                QueueUrl=queue_url,
+                ReceiptHandle=receipt_handle
             )
         except ClientError as e:
             logger.error("Failed to delete message", error=str(e))
             
+    def _queue_for(self, receipt_handle: Optional[str]) -> str:
+        return self._message_queues.get(receipt_handle, self.queue_url) if receipt_handle else self.queue_url
+        
     async def _send_status_update(self, task_id: str, status: str, data: Dict[str, Any]):
         if not self.result_queue_url:
             logger.debug("No result queue configured, skipping status update")
@@ -225,84 +369,68 @@ class SQSTaskHandler:
             **data
         }
         
+        await self.status_publisher.publish(task_id, status, message)
+        
+    async def _send_status_batch(self, entries: list) -> list:
+        sqs = await self.aws.sqs()
+        started = time.monotonic()
         try:
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.sqs.send_message(
-                    QueueUrl=self.result_queue_url,
-                    MessageBody=json.dumps(message),
-                    MessageAttributes={
-                        'task_id': {
-                            'StringValue': task_id,
-                            'DataType': 'String'
-                        },
-                        'status': {
-                            'StringValue': status,
-                            'DataType': 'String'
-                        }
-                    }
-                )
+            response = await sqs.send_message_batch(
+                QueueUrl=self.result_queue_url,
+                Entries=entries
             )
-        except ClientError as e:
-            logger.error("Failed to send status update", error=str(e))
-            
-    async def _save_artifacts(self, task_id: str, events: list) -> str:
-        # Create artifact data
-        artifact = {
+        except Exception:
+            STATUS_UPDATES_TOTAL.labels(result="failed").inc(len(entries))
+            raise
+        STATUS_SEND_SECONDS.observe(time.monotonic() - started)
+        
+        failed = response.get('Failed', [])
+        STATUS_UPDATES_TOTAL.labels(result="sent").inc(len(entries) - len(failed))
+        if failed:
+            STATUS_UPDATES_TOTAL.labels(result="failed").inc(len(failed))
+        return failed
+        
+    async def _save_artifacts(self, task_id: str, artifacts: ArtifactStream, run_summary: RunSummary) -> str:
+        started = time.monotonic()
+        
+        # Finish the streamed event log
+        if not await artifacts.complete():
+            return ""
+        ARTIFACT_BYTES.observe(artifacts.bytes_written)
+        
+        # Write the summary as a separate small object next to the events
+        summary = {
             "task_id": task_id,
             "timestamp": self._get_timestamp(),
-            "events": events,
-            "summary": self._create_summary(events)
+            "events_url": self._object_url(artifacts.key),
+            "event_count": artifacts.events_written,
+            "summary": run_summary.to_dict()
         }
-        
-        # Upload to S3
-        key = f"tasks/{task_id}/result.json"
+        key = f"tasks/{task_id}/summary.json"
         
         try:
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.s3.put_object(
-                    Bucket=self.s3_bucket,
-                    Key=key,
-                    Body=json.dumps(artifact, indent=2),
-                    ContentType='application/json'
-                )
+            s3 = await self.aws.s3()
+            await s3.put_object(
+                Bucket=self.s3_bucket,
+                Key=key,
+                Body=json.dumps(summary, default=str),
+                ContentType='application/json'
             )
+            ARTIFACT_UPLOAD_SECONDS.observe(time.monotonic() - started)
+            return self._object_url(key)
             
-            # Return S3 URL
-            if config.aws_endpoint_url:
-                # LocalStack URL
-                return f"{config.aws_endpoint_url}/{self.s3_bucket}/{key}"
-            else:
-                # Real S3 URL
-                return f"https://{self.s3_bucket}.s3.amazonaws.com/{key}"
-                
         except ClientError as e:
             logger.error("Failed to save artifacts", error=str(e))
             return ""
             
-    def _create_summary(self, events: list) -> Dict[str, Any]:
-        summary = {
-            "total_events": len(events),
-            "tools_used": [],
-            "files_changed": [],
-            "errors": []
-        }
-        
-        for event in events:
-            if event["type"] == EventType.TOOL_USE and event.get("status") == "completed":
-                tool = event.get("tool", "")
-                if tool not in summary["tools_used"]:
-                    summary["tools_used"].append(tool)
-                    
-            elif event["type"] == EventType.COMPLETION:
-                summary["files_changed"] = event.get("summary", {}).get("changes", [])
-                
-            elif event["type"] == EventType.ERROR:
-                summary["errors"].append(event.get("error", "Unknown error"))
-                
-        return summary
-        
+    def _object_url(self, key: str) -> str:
+        if config.aws_endpoint_url:
+            # LocalStack URL
+            return f"{config.aws_endpoint_url}/{self.s3_bucket}/{key}"
+        else:
+            # Real S3 URL
+            return f"https://{self.s3_bucket}.s3.amazonaws.com/{key}"
+            
     def _get_timestamp(self) -> str:
         from datetime import datetime
         return datetime.utcnow().isoformat() + "Z"
\ No newline at end of file
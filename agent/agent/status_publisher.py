@@ -0,0 +1,156 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import structlog
+
+from agent.event_parser import EventType
+
+logger = structlog.get_logger()
+
+# SendMessageBatch limits
+SQS_MAX_BATCH_ENTRIES = 10
+SQS_MAX_BATCH_BYTES = 262144
+
+# Statuses that end (or pause) a task and must reach the result queue right away
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "RETRYING", "CANCELLED"}
+
+
+class _PendingUpdate:
+    __slots__ = ("key", "entry", "size")
+
+    def __init__(self, key: Optional[str], entry: Dict[str, Any]):
+        self.key = key
+        self.entry = entry
+        self.size = len(entry["MessageBody"].encode("utf-8"))
+
+
+# Buffers status updates per task, coalescing superseded progress, and sends them with SendMessageBatch
+class StatusPublisher:
+    def __init__(
+        self,
+        send_batch: Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]],
+        batch_size: int = SQS_MAX_BATCH_ENTRIES,
+        flush_interval: float = 1.0
+    ):
+        self.send_batch = send_batch
+        self.batch_size = max(1, min(batch_size, SQS_MAX_BATCH_ENTRIES))
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, List[_PendingUpdate]] = {}
+        self._pending_count = 0
+        self._flush_lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    async def publish(self, task_id: str, status: str, message: Dict[str, Any]):
+        entry = {
+            "MessageBody": json.dumps(message),
+            "MessageAttributes": {
+                'task_id': {
+                    'StringValue': task_id,
+                    'DataType': 'String'
+                },
+                'status': {
+                    'StringValue': status,
+                    'DataType': 'String'
+                }
+            }
+        }
+
+        updates = self._pending.setdefault(task_id, [])
+        supersedes, key = self._coalesce_keys(status, message)
+        if supersedes:
+            kept = [u for u in updates if u.key != supersedes]
+            self._pending_count -= len(updates) - len(kept)
+            updates[:] = kept
+        updates.append(_PendingUpdate(key, entry))
+        self._pending_count += 1
+
+        if status in TERMINAL_STATUSES:
+            await self.flush(task_id)
+            return
+
+        self._ensure_flusher()
+        if self._pending_count >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self, task_id: Optional[str] = None):
+        async with self._flush_lock:
+            if task_id is None:
+                updates = [u for task_updates in self._pending.values() for u in task_updates]
+                self._pending.clear()
+            else:
+                updates = self._pending.pop(task_id, [])
+            self._pending_count -= len(updates)
+
+            for batch in self._batches(updates):
+                try:
+                    failed = await self.send_batch(batch)
+                except Exception as e:
+                    logger.error("Failed to send status updates", error=str(e), count=len(batch))
+                    continue
+                if failed:
+                    logger.error(
+                        "Some status updates were rejected",
+                        count=len(failed),
+                        errors=[f.get("Message", f.get("Code")) for f in failed]
+                    )
+
+    async def close(self):
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def _coalesce_keys(self, status: str, message: Dict[str, Any]):
+        # Returns (key of the pending update this one replaces, key of this update)
+        progress = message.get("progress")
+        if status != "PROCESSING" or not isinstance(progress, dict):
+            return None, None
+
+        if progress.get("type") == EventType.PROGRESS:
+            return "progress", "progress"
+
+        if progress.get("type") == EventType.TOOL_USE:
+            # Concurrent calls of the same tool are told apart by their id
+            tool_key = f"tool:{progress.get('tool_id') or progress.get('tool', '')}"
+            if progress.get("status") == "started":
+                return None, tool_key
+            return tool_key, None
+
+        return None, None
+
+    def _batches(self, updates: List[_PendingUpdate]):
+        batch: List[Dict[str, Any]] = []
+        batch_bytes = 0
+        for update in updates:
+            if batch and (len(batch) >= self.batch_size or batch_bytes + update.size > SQS_MAX_BATCH_BYTES):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append({"Id": str(len(batch)), **update.entry})
+            batch_bytes += update.size
+        if batch:
+            yield batch
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def _run_flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending_count:
+                await self.flush()
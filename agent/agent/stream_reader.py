@@ -0,0 +1,104 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Bytes requested from the pipe per read
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+# Diagnostic output is kept per line up to this many characters
+MAX_STDERR_LINE_CHARS = 2000
+
+
+async def iter_lines(
+    stream: asyncio.StreamReader,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_line_bytes: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    # StreamReader.readline fails past 64 KiB; stream-json lines can be many megabytes
+    buffer = bytearray()
+    # Offset up to which the buffer is known to contain no newline
+    scanned = 0
+    # Bytes skipped so far of an oversized line, None when not skipping
+    skipped: Optional[int] = None
+    
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+            
+        if skipped is not None:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                skipped += len(chunk)
+                continue
+            skipped += newline + 1
+            logger.warning("Discarded oversized output line", bytes=skipped, limit=max_line_bytes)
+            skipped = None
+            chunk = chunk[newline + 1:]
+            
+        buffer += chunk
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", max(scanned, start))
+            if newline < 0:
+                break
+            yield bytes(buffer[start:newline + 1])
+            start = newline + 1
+            
+        if start:
+            # One front deletion per chunk rather than one per line
+            del buffer[:start]
+        scanned = len(buffer)
+        
+        if max_line_bytes and len(buffer) > max_line_bytes:
+            skipped = len(buffer)
+            buffer.clear()
+            scanned = 0
+            
+    if skipped is not None:
+        logger.warning("Discarded oversized output line", bytes=skipped, limit=max_line_bytes)
+    elif buffer:
+        # Final line without a trailing newline
+        yield bytes(buffer)
+
+
+# Reads stderr on its own task so a chatty child can't block on a full pipe; keeps a tail for error reports
+class StderrDrain:
+    def __init__(self, stream: asyncio.StreamReader, tail_lines: int = 200, max_pending: int = 100):
+        self.tail: Deque[str] = deque(maxlen=tail_lines)
+        self._pending: Deque[str] = deque(maxlen=max_pending)
+        self.lines_read = 0
+        self.lines_dropped = 0
+        self._task = asyncio.create_task(self._drain(stream))
+        
+    async def _drain(self, stream: asyncio.StreamReader):
+        async for raw in iter_lines(stream, chunk_size=64 * 1024, max_line_bytes=1024 * 1024):
+            line = raw.decode("utf-8", errors="replace").rstrip()[:MAX_STDERR_LINE_CHARS]
+            if not line:
+                continue
+            self.lines_read += 1
+            self.tail.append(line)
+            if len(self._pending) == self._pending.maxlen:
+                self.lines_dropped += 1
+            self._pending.append(line)
+            
+    def pending(self) -> List[str]:
+        lines = list(self._pending)
+        self._pending.clear()
+        return lines
+        
+    def tail_text(self) -> str:
+        return "\n".join(self.tail)
+        
+    async def wait(self):
+        try:
+            await self._task
+        except Exception as e:
+            logger.warning("Failed to read stderr", error=str(e))
+            
+    def cancel(self):
+        self._task.cancel()
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import signal
+import time
+from typing import Awaitable, Optional, TypeVar
+
+import structlog
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+# Reasons a task can be stopped before it finishes on its own
+STOP_TIMEOUT = "timeout"
+STOP_IDLE_TIMEOUT = "idle_timeout"
+STOP_CANCELLED = "cancelled"
+
+
+class TaskStopped(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def kill_process_group(pid: int, sig: int) -> bool:
+    # The CLI is started in its own session, so its pid is also the group id
+    try:
+        os.killpg(pid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+# Enforces one task's deadline (setup included) and idle-output limit
+class TaskSupervisor:
+    def __init__(self, timeout: float, idle_timeout: float, kill_grace: float):
+        self.deadline = time.monotonic() + timeout if timeout > 0 else None
+        self.idle_timeout = idle_timeout
+        self.kill_grace = kill_grace
+        self.reason: Optional[str] = None
+
+        self._stop_requested = asyncio.Event()
+        self._last_activity = time.monotonic()
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._watchdog: Optional[asyncio.Task] = None
+
+    @property
+    def stopped(self) -> bool:
+        return self.reason is not None
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def touch(self):
+        self._last_activity = time.monotonic()
+
+    def request_stop(self, reason: str):
+        if self.reason is None:
+            self.reason = reason
+        self._stop_requested.set()
+
+    async def run(self, step: Awaitable[T]) -> T:
+        # Run a setup step (such as the clone) under the same deadline and cancellation
+        if self.stopped:
+            raise TaskStopped(self.reason)
+
+        task = asyncio.ensure_future(step)
+        stop = asyncio.ensure_future(self._stop_requested.wait())
+        try:
+            done, _ = await asyncio.wait({task, stop}, timeout=self.remaining(), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop.cancel()
+
+        if task in done:
+            return task.result()
+
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self.request_stop(STOP_TIMEOUT)
+        raise TaskStopped(self.reason)
+
+    def watch(self, proc: asyncio.subprocess.Process):
+        self._proc = proc
+        self.touch()
+        self._watchdog = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        proc = self._proc
+        while proc.returncode is None and not self._stop_requested.is_set():
+            now = time.monotonic()
+            if self.deadline is not None and now >= self.deadline:
+                self.request_stop(STOP_TIMEOUT)
+                break
+            if self.idle_timeout > 0 and now - self._last_activity >= self.idle_timeout:
+                self.request_stop(STOP_IDLE_TIMEOUT)
+                break
+
+            # Sleep until the nearest limit could be reached or a stop is requested
+            wake_at = []
+            if self.deadline is not None:
+                wake_at.append(self.deadline)
+            if self.idle_timeout > 0:
+                wake_at.append(self._last_activity + self.idle_timeout)
+            timeout = max(0.0, min(wake_at) - now) if wake_at else None
+            try:
+                await asyncio.wait_for(self._stop_requested.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        if proc.returncode is None and self.stopped:
+            logger.warning("Stopping Claude process", pid=proc.pid, reason=self.reason)
+            await self._terminate(proc)
+
+    async def _terminate(self, proc: asyncio.subprocess.Process):
+        if not kill_process_group(proc.pid, signal.SIGTERM):
+            return
+        try:
+            await asyncio.wait_for(proc.wait(), self.kill_grace)
+        except asyncio.TimeoutError:
+            logger.warning("Claude process ignored SIGTERM, killing", pid=proc.pid)
+            kill_process_group(proc.pid, signal.SIGKILL)
+            await proc.wait()
+
+    def close(self):
+        # Never leave the process group behind, e.g. when the consumer goes away mid-stream
+        if self._watchdog:
+            self._watchdog.cancel()
+        if self._proc and self._proc.returncode is None:
+            kill_process_group(self._proc.pid, signal.SIGKILL)
@@ -0,0 +1,102 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+# SQS never allows a message to stay invisible for more than 12 hours after receipt
+SQS_MAX_VISIBILITY_SECONDS = 43200
+
+# Renew this long before the current lease runs out, at minimum
+MIN_RENEWAL_MARGIN_SECONDS = 15
+
+# Delay before retrying a failed ChangeMessageVisibility call
+RETRY_DELAY_SECONDS = 5
+
+
+class _Lease:
+    def __init__(self, receipt_handle: str, received_at: float, expires_at: float):
+        self.receipt_handle = receipt_handle
+        self.received_at = received_at
+        self.expires_at = expires_at
+        self.task: Optional[asyncio.Task] = None
+
+
+# Extends in-flight messages' visibility shortly before it lapses, doubling each time up to max_extension
+class VisibilityHeartbeat:
+    def __init__(
+        self,
+        change_visibility: Callable[[str, int], Awaitable[None]],
+        visibility_timeout: int,
+        max_extension: int,
+        max_lease: int
+    ):
+        self.change_visibility = change_visibility
+        self.visibility_timeout = visibility_timeout
+        self.max_extension = max(max_extension, visibility_timeout)
+        self.max_lease = min(max_lease, SQS_MAX_VISIBILITY_SECONDS)
+        self._leases: Dict[str, _Lease] = {}
+
+    def start(self, receipt_handle: Optional[str], received_at: Optional[float] = None):
+        if not receipt_handle or receipt_handle in self._leases:
+            return
+
+        loop = asyncio.get_running_loop()
+        received_at = received_at if received_at is not None else loop.time()
+        lease = _Lease(receipt_handle, received_at, received_at + self.visibility_timeout)
+        lease.task = asyncio.create_task(self._run(lease))
+        self._leases[receipt_handle] = lease
+
+    async def stop(self, receipt_handle: Optional[str]):
+        lease = self._leases.pop(receipt_handle, None) if receipt_handle else None
+        if lease and lease.task and lease.task is not asyncio.current_task():
+            lease.task.cancel()
+            try:
+                await lease.task
+            except asyncio.CancelledError:
+                pass
+
+    async def close(self):
+        for receipt_handle in list(self._leases):
+            await self.stop(receipt_handle)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._leases)
+
+    async def _run(self, lease: _Lease):
+        loop = asyncio.get_running_loop()
+        extension = self.visibility_timeout
+        deadline = lease.received_at + self.max_lease
+
+        while True:
+            margin = max(MIN_RENEWAL_MARGIN_SECONDS, extension // 3)
+            await asyncio.sleep(max(0.0, lease.expires_at - margin - loop.time()))
+
+            now = loop.time()
+            next_extension = min(extension * 2, self.max_extension)
+            timeout = int(min(next_extension, deadline - now))
+            if now + timeout - lease.expires_at < margin:
+                # Task ran past its allowed lease; let SQS make the message visible again
+                logger.warning(
+                    "Visibility lease reached its limit",
+                    receipt_handle=lease.receipt_handle[:16],
+                    lease_seconds=int(now - lease.received_at)
+                )
+                self._leases.pop(lease.receipt_handle, None)
+                return
+
+            try:
+                await self.change_visibility(lease.receipt_handle, timeout)
+            except Exception as e:
+                logger.warning("Failed to extend message visibility", error=str(e))
+                if loop.time() >= lease.expires_at:
+                    self._leases.pop(lease.receipt_handle, None)
+                    return
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+                continue
+
+            lease.expires_at = now + timeout
+            extension = next_extension
+            logger.debug("Extended message visibility", timeout=timeout)
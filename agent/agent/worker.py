@@ -1,51 +1,139 @@
 import asyncio
+import functools
 import os
-from typing import Optional
+import time
+from typing import List, Optional, Set
 
 import structlog
 from redis import asyncio as aioredis
 
+from agent.aws import AWSClients
+from agent.backoff import ExponentialBackoff
+from agent.lanes import Lane, SlotScheduler, load_lanes
+from agent.result_cache import TaskResultCache
 from agent.session import SessionManager
 from agent.claude_code import ClaudeCodeWrapper
 from agent.sqs_handler import SQSTaskHandler
 from agent.config import config
+from agent.metrics import (
+    TASK_SLOTS_TOTAL,
+    TASK_SLOTS_BUSY,
+    LANE_SLOTS_BUSY,
+    TASK_SLOT_WAIT_SECONDS,
+    TASK_DURATION_SECONDS,
+    TASKS_PROCESSED_TOTAL,
+)
 
 logger = structlog.get_logger()
 
+# SQS returns at most this many messages per ReceiveMessage call
+SQS_MAX_RECEIVE_MESSAGES = 10
+
+# Pause after an empty receive that returned without long polling
+EMPTY_RECEIVE_PAUSE_SECONDS = 1.0
+
+# Extra time on top of the long poll wait for a poll in progress to finish at shutdown
+POLL_STOP_GRACE_SECONDS = 5.0
+
 
 class AgentWorker:
     def __init__(self):
         self.running = False
         self.redis_client: Optional[aioredis.Redis] = None
+        self._cancel_listener: Optional[asyncio.Task] = None
+        
+        # Task slots: a new message is only received once a slot is free.
+        # Lanes (one queue each) share the slots by weight.
+        self.max_concurrent_tasks = max(1, config.max_concurrent_tasks)
+        self.lanes = load_lanes(config.sqs_lanes, config.sqs_queue_url)
+        self.scheduler = SlotScheduler(self.lanes, self.max_concurrent_tasks)
+        self._in_flight: Set[asyncio.Task] = set()
+        self._pollers: List[asyncio.Task] = []
+        # Pollers blocked on a free slot; stopping cancels these straight away
+        self._slot_waiters: Set[asyncio.Task] = set()
+        TASK_SLOTS_TOTAL.set(self.max_concurrent_tasks)
         
         # Initialize components
         self.session_manager = SessionManager()
         self.claude_wrapper = ClaudeCodeWrapper(self.session_manager)
-        self.sqs_handler = SQSTaskHandler(self.claude_wrapper)
+        self.aws_clients = AWSClients()
+        self.sqs_handler = SQSTaskHandler(self.claude_wrapper, self.aws_clients)
+        
+    @property
+    def busy_slots(self) -> int:
+        return len(self._in_flight)
         
     async def start(self):
         self.running = True
-        logger.info("Starting agent worker")
+        logger.info(
+            "Starting agent worker",
+            max_concurrent_tasks=self.max_concurrent_tasks,
+            lanes=[lane.name for lane in self.lanes]
+        )
         
         # Initialize connections
         await self._init_connections()
+        await self.claude_wrapper.start()
+        
+        # Listen for cancellation requests of running tasks
+        if self.redis_client:
+            self._cancel_listener = asyncio.create_task(self._listen_for_cancellations())
+            
+        # Start one processing loop per lane; stop() waits for them to finish
+        self._pollers = [asyncio.create_task(self._poll_lane(lane)) for lane in self.lanes]
+        await asyncio.gather(*self._pollers, return_exceptions=True)
         
-        # Start processing loop
-        while self.running:
-            try:
-                await self._process_messages()
-            except Exception as e:
-                logger.error("Error processing messages", error=str(e))
-                await asyncio.sleep(5)  # Back off on error
-                
     async def stop(self):
         logger.info("Stopping agent worker")
         self.running = False
         
+        # Stop polling, then let running tasks finish while their visibility leases are still extended.
+        # Everything below is used by running tasks, so it is only torn down once they are done.
+        await self._stop_polling()
+        await self._drain_in_flight()
+        
+        # Draining tasks could still be cancelled until here
+        if self._cancel_listener:
+            self._cancel_listener.cancel()
+            await asyncio.gather(self._cancel_listener, return_exceptions=True)
+            
+        # Release warm workspaces
+        await self.claude_wrapper.stop()
+        
+        # Stop visibility heartbeats, flush pending status updates and close AWS clients
+        await self.sqs_handler.close()
+        await self.aws_clients.close()
+        
+        # Stop the session reaper; anything left over is swept on next start
+        self.session_manager.close()
+        
         # Close connections
         if self.redis_client:
             await self.redis_client.close()
             
+    async def _stop_polling(self):
+        for task in list(self._slot_waiters):
+            task.cancel()
+        # A receive in progress returns within its long poll wait
+        pollers = [task for task in self._pollers if not task.done()]
+        if pollers:
+            _, pending = await asyncio.wait(pollers, timeout=config.sqs_receive_wait_seconds + POLL_STOP_GRACE_SECONDS)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            
+    async def _drain_in_flight(self):
+        if not self._in_flight:
+            return
+        logger.info("Waiting for in-flight tasks", count=len(self._in_flight))
+        _, pending = await asyncio.wait(set(self._in_flight), timeout=config.shutdown_grace_seconds)
+        if pending:
+            # Cancelled tasks kill their Claude process and hand their message back to the queue
+            logger.warning("Cancelling tasks still running after the shutdown grace period", count=len(pending))
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            
     async def _init_connections(self):
         # Initialize Redis (optional, for caching/state)
         if config.redis_url:
@@ -55,20 +143,129 @@ class AgentWorker:
             except Exception as e:
                 logger.warning("Failed to connect to Redis", error=str(e))
                 
-    async def _process_messages(self):
-        # Receive messages from SQS
-        messages = await self.sqs_handler.receive_messages()
+        if config.result_cache_enabled:
+            if self.redis_client:
+                self.claude_wrapper.result_cache = TaskResultCache(
+                    self.redis_client,
+                    ttl=config.result_cache_ttl_seconds,
+                    max_bytes=config.result_cache_max_bytes,
+                    max_entry_bytes=config.result_cache_max_entry_bytes
+                )
+            else:
+                logger.warning("Result cache needs Redis; running without it")
+                
+    async def _listen_for_cancellations(self):
+        # Every worker receives each request; only the one running the task acts on it
+        while self.running:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(config.task_cancel_channel)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    data = message["data"]
+                    task_id = data.decode("utf-8") if isinstance(data, bytes) else str(data)
+                    if self.claude_wrapper.cancel_task(task_id.strip()):
+                        logger.info("Cancellation requested", task_id=task_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cancellation listener failed", error=str(e))
+                await asyncio.sleep(5)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+                    
+    async def _poll_lane(self, lane: Lane):
+        backoff = ExponentialBackoff(
+            config.poll_error_backoff_base_seconds,
+            config.poll_error_backoff_max_seconds
+        )
+        while self.running:
+            try:
+                await self._process_messages(lane)
+                backoff.reset()
+            except Exception as e:
+                delay = backoff.next_delay()
+                logger.error("Error processing messages", lane=lane.name, error=str(e), retry_in=round(delay, 2))
+                await asyncio.sleep(delay)
+                
+    async def _process_messages(self, lane: Lane):
+        # Wait for a free slot before polling so we never hold messages we can't run
+        wait_started = time.monotonic()
+        poller = asyncio.current_task()
+        self._slot_waiters.add(poller)
+        try:
+            await self.scheduler.acquire(lane.name)
+        finally:
+            self._slot_waiters.discard(poller)
+        TASK_SLOT_WAIT_SECONDS.observe(time.monotonic() - wait_started)
+        if not self.running:
+            self.scheduler.release(lane.name)
+            return
         
-        if not messages:
-            # No messages, short sleep
-            await asyncio.sleep(1)
+        # Claim other free slots nobody else is waiting for and ask for that many messages
+        claimed = 1 + self.scheduler.claim_more(lane.name, SQS_MAX_RECEIVE_MESSAGES - 1)
+        
+        # Don't sit on slots through a full long poll while other lanes wait for one
+        if self.scheduler.contended(lane.name):
+            wait_time = min(config.sqs_contended_wait_seconds, config.sqs_receive_wait_seconds)
+        else:
+            wait_time = config.sqs_receive_wait_seconds
+            
+        try:
+            poll_started = time.monotonic()
+            messages = await self.sqs_handler.receive_messages(
+                max_messages=claimed,
+                wait_time_seconds=wait_time,
+                queue_url=lane.queue_url
+            )
+        except BaseException:
+            self.scheduler.release(lane.name, claimed)
+            raise
+            
+        if not self.running:
+            # Stopping: hand the messages straight back instead of leaving them invisible
+            self.scheduler.release(lane.name, claimed)
+            if messages:
+                await self.sqs_handler.return_messages(messages, queue_url=lane.queue_url)
             return
             
-        # Process messages concurrently (up to a limit)
-        tasks = []
-        for message in messages[:5]:  # Process max 5 messages concurrently
-            task = asyncio.create_task(self.sqs_handler.process_message(message))
-            tasks.append(task)
+        # Each acquired slot is handed over to a task and released when it finishes
+        for message in messages[:claimed]:
+            self._start_task(message, lane)
+        self.scheduler.release(lane.name, claimed - min(len(messages), claimed))
+        
+        # Long polling already waited for messages; only pause when it didn't
+        if not messages and time.monotonic() - poll_started < EMPTY_RECEIVE_PAUSE_SECONDS:
+            await asyncio.sleep(EMPTY_RECEIVE_PAUSE_SECONDS)
+            
+    def _start_task(self, message, lane: Lane):
+        task = asyncio.create_task(self._run_slot(message, lane))
+        self._in_flight.add(task)
+        TASK_SLOTS_BUSY.set(len(self._in_flight))
+        LANE_SLOTS_BUSY.labels(lane=lane.name).set(self.scheduler.running(lane.name))
+        task.add_done_callback(functools.partial(self._on_slot_done, lane))
+        
+    async def _run_slot(self, message, lane: Lane):
+        started = time.monotonic()
+        outcome = "ok"
+        try:
+            await self.sqs_handler.process_message(message, queue_url=lane.queue_url)
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            outcome = "error"
+            logger.error("Unhandled error in task slot", error=str(e))
+        finally:
+            TASK_DURATION_SECONDS.observe(time.monotonic() - started)
+            TASKS_PROCESSED_TOTAL.labels(outcome=outcome).inc()
             
-        # Wait for all tasks to complete
-        await asyncio.gather(*tasks, return_exceptions=True)
\ No newline at end of file
+    def _on_slot_done(self, lane: Lane, task: asyncio.Task):
+        self._in_flight.discard(task)
+        self.scheduler.release(lane.name)
+        TASK_SLOTS_BUSY.set(len(self._in_flight))
+        LANE_SLOTS_BUSY.labels(lane=lane.name).set(self.scheduler.running(lane.name))
@@ -0,0 +1 @@
+# Agent benchmarks package
@@ -0,0 +1,77 @@
+"""Benchmarks for ClaudeOutputParser on large tool_use payloads.
+
+Run from the agent directory:
+
+    python -m benchmarks.bench_event_parser --size-mb 8
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from agent.event_parser import ClaudeOutputParser, EventType
+
+
+def build_write_stream(size_mb: float, fragment_size: int = 64) -> List[str]:
+    """Stream-json lines for a Write tool call with ``size_mb`` of content,
+    delivered as input_json_delta fragments interleaved with a text block."""
+    content = ("x" * 79 + "\n") * int(size_mb * 1024 * 1024 / 80)
+    payload = json.dumps({"file_path": "/repo/big_file.txt", "content": content})
+
+    lines = [
+        json.dumps({"type": "message_start", "message": {"id": "msg_1"}}),
+        json.dumps({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}),
+        json.dumps({
+            "type": "content_block_start",
+            "index": 1,
+            "content_block": {"type": "tool_use", "id": "toolu_1", "name": "Write", "input": {}}
+        }),
+    ]
+    for i in range(0, len(payload), fragment_size):
+        lines.append(json.dumps({
+            "type": "content_block_delta",
+            "index": 1,
+            "delta": {"type": "input_json_delta", "partial_json": payload[i:i + fragment_size]}
+        }))
+        if i % (fragment_size * 64) == 0:
+            lines.append(json.dumps({
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": "Writing..."}
+            }))
+    lines.extend([
+        json.dumps({"type": "content_block_stop", "index": 0}),
+        json.dumps({"type": "content_block_stop", "index": 1}),
+        json.dumps({"type": "message_delta", "delta": {"stop_reason": "end_turn"}}),
+    ])
+    return [line + "\n" for line in lines]
+
+
+def run(size_mb: float, repeat: int):
+    lines = build_write_stream(size_mb)
+    total_bytes = sum(len(line) for line in lines)
+    print(f"stream: {len(lines)} lines, {total_bytes / 1e6:.1f} MB")
+
+    for attempt in range(repeat):
+        parser = ClaudeOutputParser()
+        started = time.perf_counter()
+        completed = None
+        for line in lines:
+            event = parser.parse_line(line)
+            if event and event["type"] == EventType.TOOL_USE and event["status"] == "completed":
+                completed = event
+        elapsed = time.perf_counter() - started
+
+        assert completed is not None and completed["file_path"] == "/repo/big_file.txt"
+        print(
+            f"run {attempt + 1}: {elapsed * 1000:.1f} ms, "
+            f"{total_bytes / elapsed / 1e6:.1f} MB/s, {len(lines) / elapsed:,.0f} lines/s"
+        )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--size-mb", type=float, default=4.0)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+    run(args.size_mb, args.repeat)
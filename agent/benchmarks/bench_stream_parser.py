@@ -0,0 +1,101 @@
+"""Microbenchmark for ClaudeOutputParser over stream-json captures.
+
+Replays captured ``claude --output-format stream-json`` output (one JSON
+event per line) through the parser with every available JSON backend.
+Without capture files a token-level stream is synthesized.
+
+Run from the agent directory:
+
+    python -m benchmarks.bench_stream_parser [capture.jsonl ...]
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from agent import event_parser
+from agent.event_parser import ClaudeOutputParser
+
+
+def synthesize_capture(messages: int = 200, deltas_per_message: int = 150) -> List[bytes]:
+    """Token-level stream: text deltas dominate, with a tool call per message."""
+    lines = []
+    for m in range(messages):
+        lines.append({"type": "message_start", "message": {"id": f"msg_{m}", "usage": {"input_tokens": 1200}}})
+        lines.append({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        for d in range(deltas_per_message):
+            lines.append({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": f" token{d}"}})
+        lines.append({"type": "content_block_stop", "index": 0})
+        lines.append({
+            "type": "content_block_start",
+            "index": 1,
+            "content_block": {"type": "tool_use", "id": f"toolu_{m}", "name": "Read", "input": {}}
+        })
+        lines.append({"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": '{"file_path": '}})
+        lines.append({"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": f'"/repo/file_{m}.py"}}'}})
+        lines.append({"type": "content_block_stop", "index": 1})
+        lines.append({"type": "message_delta", "delta": {"stop_reason": "tool_use"}, "usage": {"output_tokens": deltas_per_message}})
+        lines.append({"type": "message_stop"})
+    return [json.dumps(line).encode("utf-8") + b"\n" for line in lines]
+
+
+def load_captures(paths: List[str]) -> List[bytes]:
+    lines: List[bytes] = []
+    for path in paths:
+        with open(path, "rb") as f:
+            lines.extend(line for line in f if line.strip())
+    return lines
+
+
+def available_backends():
+    backends = [("json", json.loads, (json.JSONDecodeError, UnicodeDecodeError))]
+    try:
+        import orjson
+        backends.append(("orjson", orjson.loads, (orjson.JSONDecodeError,)))
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        backends.append(("msgspec", msgspec.json.Decoder().decode, (msgspec.DecodeError,)))
+    except ImportError:
+        pass
+    return backends
+
+
+def bench(lines: List[bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        parser = ClaudeOutputParser()
+        parse_line = parser.parse_line
+        started = time.perf_counter()
+        for line in lines:
+            parse_line(line)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("captures", nargs="*", help="stream-json capture files")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    lines = load_captures(args.captures) if args.captures else synthesize_capture()
+    total_bytes = sum(len(line) for line in lines)
+    print(f"{len(lines):,} lines, {total_bytes / 1e6:.1f} MB (default backend: {event_parser.JSON_BACKEND})")
+
+    original = (event_parser._loads, event_parser._DECODE_ERRORS)
+    try:
+        for name, loads, errors in available_backends():
+            event_parser._loads, event_parser._DECODE_ERRORS = loads, errors
+            elapsed = bench(lines, args.repeat)
+            print(
+                f"{name:>8}: {elapsed * 1000:8.1f} ms  "
+                f"{len(lines) / elapsed:>12,.0f} lines/s  {elapsed / len(lines) * 1e6:.2f} us/line"
+            )
+    finally:
+        event_parser._loads, event_parser._DECODE_ERRORS = original
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Throughput benchmark for agent.stream_reader.iter_lines.
+
+Feeds a stream of small events interleaved with multi-MB lines (the shape of
+a Write tool call carrying a large file) through ``iter_lines`` and, for
+comparison, through ``StreamReader.readline`` with a limit raised high
+enough to accept the large lines.
+
+Run from the agent directory:
+
+    python -m benchmarks.bench_stream_reader [--line-mb 8] [--lines 20]
+"""
+import argparse
+import asyncio
+import time
+
+from agent.stream_reader import iter_lines
+
+# Size of the pipe reads the event loop hands to the StreamReader
+PIPE_CHUNK = 64 * 1024
+
+
+def make_payload(line_mb: float, large_lines: int, small_per_large: int = 500) -> bytes:
+    small = b'{"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "token"}}\n'
+    large = b'{"type": "content_block_delta", "index": 1, "delta": {"partial_json": "' + b"x" * int(line_mb * 1024 * 1024) + b'"}}\n'
+    return (small * small_per_large + large) * large_lines
+
+
+async def run_iter_lines(payload: bytes) -> int:
+    reader = asyncio.StreamReader()
+    feeder = asyncio.create_task(feed(reader, payload))
+    count = 0
+    async for _ in iter_lines(reader):
+        count += 1
+    await feeder
+    return count
+
+
+async def run_readline(payload: bytes) -> int:
+    reader = asyncio.StreamReader(limit=len(payload))
+    feeder = asyncio.create_task(feed(reader, payload))
+    count = 0
+    while await reader.readline():
+        count += 1
+    await feeder
+    return count
+
+
+async def feed(reader: asyncio.StreamReader, payload: bytes):
+    view = memoryview(payload)
+    for i in range(0, len(view), PIPE_CHUNK):
+        reader.feed_data(view[i:i + PIPE_CHUNK])
+        # Let the consumer run between pipe reads, as with a real subprocess
+        await asyncio.sleep(0)
+    reader.feed_eof()
+
+
+def bench(name: str, run, payload: bytes, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = asyncio.run(run(payload))
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:>10}: {best * 1000:8.1f} ms  {len(payload) / best / 1e6:8.1f} MB/s  ({count:,} lines)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--line-mb", type=float, default=8.0)
+    arg_parser.add_argument("--lines", type=int, default=20, help="number of large lines")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    payload = make_payload(args.line_mb, args.lines)
+    print(f"{len(payload) / 1e6:.1f} MB, {args.lines} lines of {args.line_mb} MB")
+    bench("iter_lines", run_iter_lines, payload, args.repeat)
+    bench("readline", run_readline, payload, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+import json
+import os
+
+import pytest
+from botocore.exceptions import ClientError
+
+from agent import artifacts
+from agent.artifacts import ArtifactStream
+
+
+class FakeS3:
+    def __init__(self, fail_part=None):
+        self.fail_part = fail_part
+        self.parts = {}
+        self.objects = {}
+        self.completed = None
+        self.aborted = []
+        
+    async def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "upload-1"}
+        
+    async def upload_part(self, UploadId, PartNumber, Body, **kwargs):
+        # Later parts finish faster, so ordering can't depend on completion order
+        await asyncio.sleep(0.01 / PartNumber)
+        if PartNumber == self.fail_part:
+            raise ClientError({"Error": {"Code": "InternalError", "Message": "boom"}}, "UploadPart")
+        self.parts[PartNumber] = Body
+        return {"ETag": f'"etag-{PartNumber}"'}
+        
+    async def complete_multipart_upload(self, Key, UploadId, MultipartUpload, **kwargs):
+        self.completed = MultipartUpload["Parts"]
+        self.objects[Key] = b"".join(self.parts[part["PartNumber"]] for part in self.completed)
+        
+    async def abort_multipart_upload(self, UploadId, **kwargs):
+        self.aborted.append(UploadId)
+        
+    async def put_object(self, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+
+class FakeAWS:
+    def __init__(self, s3):
+        self._s3 = s3
+        
+    async def s3(self):
+        return self._s3
+
+
+def make_events(count):
+    return [{"type": "output", "n": i, "data": os.urandom(256).hex()} for i in range(count)]
+
+
+def decode(body):
+    return [json.loads(line) for line in gzip.decompress(body).splitlines()]
+
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    monkeypatch.setattr(artifacts, "S3_MIN_PART_SIZE", 1024)
+
+
+@pytest.mark.asyncio
+async def test_multipart_upload_round_trips_events(small_parts):
+    s3 = FakeS3()
+    stream = ArtifactStream(FakeAWS(s3), "bucket", "tasks/t1/events.ndjson.gz", part_size=1024)
+    # zlib emits output in blocks of tens of KB, so this makes several parts
+    events = make_events(1000)
+    
+    for event in events:
+        await stream.write(event)
+    assert await stream.complete()
+    
+    assert len(s3.completed) > 2
+    assert s3.completed == [{"PartNumber": n, "ETag": f'"etag-{n}"'} for n in range(1, len(s3.completed) + 1)]
+    assert decode(s3.objects["tasks/t1/events.ndjson.gz"]) == events
+    assert stream.events_written == 1000
+    assert stream.bytes_written == len(s3.objects["tasks/t1/events.ndjson.gz"])
+
+
+@pytest.mark.asyncio
+async def test_small_run_uses_single_put():
+    s3 = FakeS3()
+    stream = ArtifactStream(FakeAWS(s3), "bucket", "tasks/t2/events.ndjson.gz")
+    events = make_events(3)
+    
+    for event in events:
+        await stream.write(event)
+    assert await stream.complete()
+    
+    assert s3.completed is None and not s3.parts
+    assert decode(s3.objects["tasks/t2/events.ndjson.gz"]) == events
+
+
+@pytest.mark.asyncio
+async def test_failed_part_aborts_upload(small_parts):
+    s3 = FakeS3(fail_part=2)
+    stream = ArtifactStream(FakeAWS(s3), "bucket", "tasks/t3/events.ndjson.gz", part_size=1024)
+    
+    for event in make_events(1000):
+        await stream.write(event)
+    assert not await stream.complete()
+    
+    assert s3.aborted == ["upload-1"]
+    assert s3.completed is None
+    assert "tasks/t3/events.ndjson.gz" not in s3.objects
@@ -0,0 +1,61 @@
+import subprocess
+
+from agent.cgroups import CgroupManager
+from agent.resource_monitor import ResourceMonitor
+
+
+def fake_cgroup_root(tmp_path):
+    root = tmp_path / "cgroup"
+    root.mkdir()
+    (root / "cgroup.controllers").write_text("cpuset cpu io memory pids\n")
+    (root / "cgroup.procs").write_text("")
+    (root / "cgroup.subtree_control").write_text("")
+    return root
+
+
+def test_session_cgroup_limits(tmp_path):
+    root = fake_cgroup_root(tmp_path)
+    manager = CgroupManager(str(root), cpu_weight=50, memory_max=512 * 1024 * 1024, pids_max=256)
+    
+    cgroup = manager.create("task-1-abcd")
+    
+    assert manager.available
+    assert (root / "cgroup.subtree_control").read_text() == "+cpu +memory +pids +io"
+    assert (cgroup.path / "cpu.weight").read_text() == "50"
+    assert (cgroup.path / "memory.max").read_text() == str(512 * 1024 * 1024)
+    assert (cgroup.path / "pids.max").read_text() == "256"
+
+
+def test_wrapped_command_enters_cgroup_before_exec(tmp_path):
+    cgroup = CgroupManager(str(fake_cgroup_root(tmp_path))).create("task-1-abcd")
+    
+    proc = subprocess.Popen(cgroup.wrap_command(["sh", "-c", "echo $$"]), stdout=subprocess.PIPE, text=True)
+    stdout, _ = proc.communicate()
+    
+    assert proc.returncode == 0
+    assert (cgroup.path / "cgroup.procs").read_text() == "0\n"
+    # The wrapper execs the command, so the pid we watch is the one that moved
+    assert int(stdout) == proc.pid
+
+
+def test_falls_back_without_cgroup_v2(tmp_path):
+    manager = CgroupManager(str(tmp_path / "missing"), cpu_weight=50)
+    
+    assert not manager.available
+    assert manager.create("task-1-abcd") is None
+
+
+def test_resource_usage_prefers_cgroup_counters(tmp_path):
+    cgroup = CgroupManager(str(fake_cgroup_root(tmp_path))).create("task-1-abcd")
+    (cgroup.path / "cpu.stat").write_text("usage_usec 1000000\nuser_usec 800000\n")
+    monitor = ResourceMonitor(pid=999999999, cgroup=cgroup)
+    
+    (cgroup.path / "cpu.stat").write_text("usage_usec 3500000\nuser_usec 3000000\n")
+    (cgroup.path / "memory.peak").write_text("104857600\n")
+    (cgroup.path / "io.stat").write_text("8:0 rbytes=4096 wbytes=8192 rios=1 wios=2\n")
+    usage = monitor.stop()
+    
+    assert usage["source"] == "cgroup"
+    assert usage["cpu_seconds"] == 2.5
+    assert usage["peak_rss_bytes"] == 104857600
+    assert usage["write_bytes"] == 8192
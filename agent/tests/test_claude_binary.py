@@ -0,0 +1,39 @@
+import os
+import stat
+
+from agent import claude_binary
+from agent.claude_binary import claude_version, resolve_claude_binary
+
+
+def fake_cli(tmp_path, version="1.2.3 (Claude Code)"):
+    path = tmp_path / "claude"
+    path.write_text(f"#!/bin/sh\necho '{version}'\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def test_override_wins(tmp_path):
+    binary = fake_cli(tmp_path)
+    
+    assert resolve_claude_binary(binary) == binary
+    assert resolve_claude_binary(str(tmp_path / "missing")) == resolve_claude_binary()
+
+
+def test_version_cached_per_binary(tmp_path, monkeypatch):
+    binary = fake_cli(tmp_path)
+    cache = str(tmp_path / "cache" / "version.json")
+    calls = []
+    real_run = claude_binary.subprocess.run
+    monkeypatch.setattr(claude_binary.subprocess, "run", lambda *a, **kw: calls.append(a) or real_run(*a, **kw))
+    
+    assert claude_version(binary, cache) == "1.2.3 (Claude Code)"
+    assert claude_version(binary, cache) == "1.2.3 (Claude Code)"
+    assert len(calls) == 1
+    
+    # An upgraded binary is detected by its size/mtime
+    fake_cli(tmp_path, "1.3.0 (Claude Code)")
+    os.utime(binary, ns=(0, 1))
+    assert claude_version(binary, cache) == "1.3.0 (Claude Code)"
+    assert len(calls) == 2
+    
+    assert claude_version(str(tmp_path / "missing"), cache) is None
@@ -0,0 +1,47 @@
+import asyncio
+import stat
+
+import pytest
+
+from agent.claude_code import ClaudeCodeWrapper
+from agent.config import config
+from agent.event_parser import EventType
+from agent.metrics import CLAUDE_PROCESSES_RUNNING
+from agent.session import SessionManager
+from agent.supervisor import TaskSupervisor
+
+
+def fake_cli(tmp_path, script):
+    path = tmp_path / "claude"
+    path.write_text(f"#!/bin/sh\n{script}\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_cli_exiting_before_reading_prompt_reports_exit_code(monkeypatch, tmp_path):
+    """A CLI that dies without reading stdin yields an error event instead of a broken pipe"""
+    monkeypatch.setattr(config, "repo_cache_enabled", False)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    session_manager = SessionManager(base_dir=str(tmp_path / "sessions"))
+    wrapper = ClaudeCodeWrapper(session_manager)
+    wrapper.claude_binary = fake_cli(tmp_path, "echo 'cannot start' >&2\nexit 3")
+    session = session_manager.create_session("t1", "https://github.com/o/r")
+    session.repo_dir.mkdir()
+    supervisor = TaskSupervisor(60, 60, 1)
+    running_before = CLAUDE_PROCESSES_RUNNING._value.get()
+    
+    # Far bigger than a pipe buffer, so the write can't complete
+    prompt = "x" * (2 * 1024 * 1024)
+    events = [event async for event in wrapper._run_claude(prompt, "ask", None, session, supervisor)]
+    
+    error = events[-1]
+    assert error["type"] == EventType.ERROR
+    assert error["exit_code"] == 3
+    assert "cannot start" in error["error"]
+    assert CLAUDE_PROCESSES_RUNNING._value.get() == running_before
+    # Supervisor watchdog, resource monitor and stderr drain are all gone
+    await asyncio.sleep(0.1)
+    assert asyncio.all_tasks() == {asyncio.current_task()}
+    
+    session_manager.close()
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from agent.error_classifier import ErrorClassifier
+from agent.supervisor import STOP_IDLE_TIMEOUT, STOP_TIMEOUT
+
+
+@pytest.fixture
+def classifier():
+    return ErrorClassifier(base=30, cap=900, rng=random.Random(3))
+
+
+@pytest.mark.parametrize("event, retryable, cause", [
+    ({"error": {"type": "overloaded_error", "message": "Overloaded"}}, True, "overloaded"),
+    ({"error": {"type": "invalid_request_error", "message": "prompt is too long"}}, False, "invalid_request"),
+    ({"error": "Claude Code failed with exit code 1: API Error: 429 {\"type\":\"error\"}", "exit_code": 1}, True, "rate_limit"),
+    ({"error": "Claude Code failed with exit code 1: API Error: 401 Invalid API key", "exit_code": 1}, False, "auth"),
+    ({"error": "Claude Code failed with exit code 1: Error: read ECONNRESET", "exit_code": 1}, True, "network"),
+    ({"error": "Claude Code failed with exit code 1: TypeError: undefined", "exit_code": 1}, False, "claude_exit"),
+    ({"error": "Claude Code failed with exit code 143: ", "exit_code": 143}, True, "terminated"),
+    ({"error": "Failed to clone repository: remote: Repository not found."}, False, "clone"),
+    ({"error": "Failed to clone repository: fatal: Could not resolve host: github.com"}, True, "network"),
+    ({"error": "Missing required parameters: repository_url and prompt"}, False, "invalid_task"),
+    ({"error": "Task exceeded the time limit of 3600s", "reason": STOP_TIMEOUT}, False, "timeout"),
+    ({"error": "Claude produced no output for 600s", "reason": STOP_IDLE_TIMEOUT}, True, "idle_timeout"),
+    (None, False, "incomplete"),
+])
+def test_classifies_failures(classifier, event, retryable, cause):
+    result = classifier.classify(event, attempt=1)
+    assert (result.retryable, result.cause) == (retryable, cause)
+    assert (result.delay_seconds > 0) == retryable
+
+
+def test_retry_delay_grows_and_respects_retry_after(classifier):
+    event = {"error": {"type": "rate_limit_error", "message": "Rate limited"}}
+    delays = [classifier.classify(event, attempt=n).delay_seconds for n in range(1, 7)]
+    for attempt, delay in enumerate(delays):
+        ceiling = min(900, 30 * 2 ** attempt)
+        assert ceiling / 2 - 1 <= delay <= ceiling
+        
+    event = {"error": "API Error: 429 rate limited, retry-after: 120"}
+    assert classifier.classify(event, attempt=1).delay_seconds >= 120
@@ -0,0 +1,94 @@
+import json
+
+from agent.event_parser import ClaudeOutputParser, EventType
+
+
+def line(event):
+    return json.dumps(event) + "\n"
+
+
+def tool_stream(index, tool_id, name, params, fragment_size=7):
+    payload = json.dumps(params)
+    start = [line({
+        "type": "content_block_start",
+        "index": index,
+        "content_block": {"type": "tool_use", "id": tool_id, "name": name, "input": {}}
+    })]
+    deltas = [
+        line({"type": "content_block_delta", "index": index, "delta": {"type": "input_json_delta", "partial_json": payload[i:i + fragment_size]}})
+        for i in range(0, len(payload), fragment_size)
+    ]
+    stop = [line({"type": "content_block_stop", "index": index})]
+    return start, deltas, stop
+
+
+def test_interleaved_tool_blocks_assemble_parameters():
+    parser = ClaudeOutputParser()
+    write = tool_stream(1, "toolu_1", "Write", {"file_path": "/repo/a.py", "content": "print('a')\n" * 50})
+    edit = tool_stream(2, "toolu_2", "Edit", {"file_path": "/repo/b.py", "old_string": "x", "new_string": "y"})
+    
+    lines = write[0] + edit[0]
+    # Interleave the delta fragments of both blocks
+    for i in range(max(len(write[1]), len(edit[1]))):
+        lines += write[1][i:i + 1] + edit[1][i:i + 1]
+    lines += edit[2] + write[2]
+    
+    events = [e for e in (parser.parse_line(l) for l in lines) if e]
+    completed = [e for e in events if e["type"] == EventType.TOOL_USE and e["status"] == "completed"]
+    
+    assert [e["tool_id"] for e in completed] == ["toolu_2", "toolu_1"]
+    assert completed[1]["parameters"]["content"] == "print('a')\n" * 50
+    assert completed[0]["file_path"] == "/repo/b.py"
+    assert parser.get_summary()["changes"] == [
+        {"action": "modified", "path": "/repo/b.py", "tool": "Edit"},
+        {"action": "created", "path": "/repo/a.py", "tool": "Write"},
+    ]
+
+
+def test_parse_line_accepts_bytes_and_plain_text():
+    parser = ClaudeOutputParser()
+    
+    assert parser.parse_line(b"   \n") is None
+    started = parser.parse_line(b'{"type": "message_start", "message": {}}\n')
+    assert started["type"] == EventType.PROGRESS
+    assert started["timestamp"].endswith("Z")
+    
+    text = parser.parse_line(b"Warning: something \xff happened\n")
+    assert text["type"] == EventType.OUTPUT
+    assert text["text"].startswith("Warning: something")
+    
+    # JSON that isn't an event object is plain output too
+    assert parser.parse_line("42")["text"] == "42"
+
+
+def text_stream(index, chunks):
+    lines = [line({"type": "content_block_start", "index": index, "content_block": {"type": "text", "text": ""}})]
+    lines += [line({"type": "content_block_delta", "index": index, "delta": {"type": "text_delta", "text": c}}) for c in chunks]
+    lines.append(line({"type": "content_block_stop", "index": index}))
+    return lines
+
+
+def test_aggregate_retention_folds_text_deltas_into_message():
+    parser = ClaudeOutputParser(retention="aggregate")
+    lines = [line({"type": "ping"})] + text_stream(0, ["Hel", "lo", " world"])
+    
+    events = [e for e in (parser.parse_line(l) for l in lines) if e]
+    
+    assert len(events) == 1
+    assert events[0]["type"] == EventType.MESSAGE
+    assert events[0]["text"] == "Hello world"
+    assert parser.get_summary()["events_dropped"] == 1
+
+
+def test_drop_and_sample_retention():
+    lines = text_stream(0, [str(i) for i in range(10)])
+    
+    dropped = ClaudeOutputParser(retention="drop")
+    assert [e for e in (dropped.parse_line(l) for l in lines) if e] == []
+    
+    sampled = ClaudeOutputParser(retention="sample", sample_every=4)
+    events = [e for e in (sampled.parse_line(l) for l in lines) if e]
+    assert [e["data"]["delta"]["text"] for e in events] == ["0", "4", "8"]
+    
+    kept = ClaudeOutputParser(retention="keep")
+    assert len([e for e in (kept.parse_line(l) for l in lines) if e]) == len(lines)
@@ -0,0 +1,39 @@
+import asyncio
+import stat
+
+import pytest
+
+from agent.git import run_git
+from agent.supervisor import TaskStopped, TaskSupervisor
+
+
+def alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Field after the parenthesised command name is the state; zombies have exited
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.asyncio
+async def test_deadline_kills_stalled_git_and_its_children(monkeypatch, tmp_path):
+    """A clone that hangs past the task deadline doesn't outlive the task"""
+    pids = tmp_path / "pids"
+    git = tmp_path / "bin" / "git"
+    git.parent.mkdir()
+    git.write_text(f"#!/bin/sh\nsleep 30 &\necho $$ $! > {pids}\nwait\n")
+    git.chmod(git.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{git.parent}:/usr/bin:/bin")
+    supervisor = TaskSupervisor(0.3, 0, 1)
+    
+    with pytest.raises(TaskStopped):
+        await supervisor.run(run_git("clone", "https://github.com/o/r", str(tmp_path / "repo")))
+        
+    shell, helper = (int(pid) for pid in pids.read_text().split())
+    for _ in range(50):
+        if not alive(shell) and not alive(helper):
+            break
+        await asyncio.sleep(0.02)
+    assert not alive(shell)
+    assert not alive(helper)
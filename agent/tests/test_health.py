@@ -1,11 +1,19 @@
+import sys
+
 import pytest
 from httpx import AsyncClient
+from agent.config import config
+from agent.health import HealthChecker
 from agent.main import app
 
 
 @pytest.mark.asyncio
-async def test_health_endpoint():
+async def test_health_endpoint(monkeypatch, tmp_path):
     """Test health endpoint returns healthy status"""
+    # Stand-in for the Claude CLI, which isn't installed in the test environment
+    monkeypatch.setattr(config, "claude_binary", sys.executable)
+    # The disk probe needs the session directory to exist
+    monkeypatch.setattr(config, "session_base_dir", str(tmp_path))
     async with AsyncClient(app=app, base_url="http://test") as client:
         response = await client.get("/health")
         assert response.status_code == 200
@@ -27,4 +35,61 @@ async def test_metrics_endpoint():
         content = response.text
         # Check for standard prometheus metrics
         assert "# HELP" in content
-        assert "# TYPE" in content
\ No newline at end of file
+        assert "# TYPE" in content
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_task_lifecycle():
+    """Test lifecycle metrics are registered even before any task runs"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        content = (await client.get("/metrics")).text
+        for name in (
+            "agent_sqs_receive_seconds",
+            "agent_task_queue_wait_seconds",
+            "agent_workspace_prepare_seconds",
+            "agent_claude_first_event_seconds",
+            "agent_status_send_seconds",
+            "agent_artifact_upload_seconds",
+            "agent_task_failures_total",
+            "agent_claude_processes_running",
+        ):
+            assert f"# TYPE {name}" in content
+
+
+class FakeWorker:
+    def __init__(self, busy_slots, max_concurrent_tasks=2):
+        self.busy_slots = busy_slots
+        self.max_concurrent_tasks = max_concurrent_tasks
+        self.redis_client = None
+        self.lanes = []
+        self.claude_wrapper = type("Wrapper", (), {"claude_binary": sys.executable})()
+
+
+@pytest.mark.asyncio
+async def test_readiness_follows_slots_and_caches_probes(monkeypatch, tmp_path):
+    """Test readiness flips when all slots are busy and probes are cached"""
+    monkeypatch.setattr(config, "session_base_dir", str(tmp_path))
+    worker = FakeWorker(busy_slots=1)
+    checker = HealthChecker(worker, ttl=60)
+    calls = []
+    original = checker._check_disk
+    
+    async def counting_disk_check():
+        calls.append(1)
+        return await original()
+    monkeypatch.setattr(checker, "_check_disk", counting_disk_check)
+    
+    assert (await checker.status()).ready
+    worker.busy_slots = 2
+    status = await checker.status()
+    assert status.status == "healthy"
+    assert not status.ready
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_liveness_endpoint():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/health/live")
+        assert response.status_code == 200
+        # Without a worker the app can't take tasks
+        assert (await client.get("/health/ready")).status_code == 503
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+from agent.lanes import DEFAULT_LANE, Lane, SlotScheduler, load_lanes
+
+
+def test_load_lanes_defaults_to_single_queue():
+    lanes = load_lanes("", "https://sqs/tasks")
+    assert [(lane.name, lane.queue_url, lane.weight) for lane in lanes] == [(DEFAULT_LANE, "https://sqs/tasks", 1.0)]
+    
+    raw = json.dumps([
+        {"name": "interactive", "queue_url": "https://sqs/ask", "weight": 3},
+        {"name": "write", "queue_url": "https://sqs/write", "max_concurrent": 2},
+    ])
+    lanes = load_lanes(raw, None)
+    assert [lane.name for lane in lanes] == ["interactive", "write"]
+    assert lanes[1].max_concurrent == 2
+    
+    with pytest.raises(ValueError):
+        load_lanes(json.dumps([{"name": "a", "queue_url": "x"}, {"name": "a", "queue_url": "y"}]), None)
+
+
+@pytest.mark.asyncio
+async def test_contended_slots_are_shared_by_weight():
+    scheduler = SlotScheduler([
+        Lane(name="interactive", queue_url="a", weight=3),
+        Lane(name="write", queue_url="b", weight=1),
+    ], total=1)
+    granted = []
+    
+    async def run_task(name):
+        await asyncio.sleep(0.001)
+        scheduler.release(name)
+        
+    async def poller(name):
+        # Both lanes have a backlog: take a slot, hand it to a task, ask for the next
+        tasks = []
+        while len(granted) < 40:
+            await scheduler.acquire(name)
+            granted.append(name)
+            tasks.append(asyncio.create_task(run_task(name)))
+        await asyncio.gather(*tasks)
+        
+    await asyncio.gather(poller("interactive"), poller("write"))
+    assert granted[:40].count("interactive") == pytest.approx(30, abs=2)
+
+@pytest.mark.asyncio
+async def test_lane_cap_and_idle_lanes_lend_slots():
+    scheduler = SlotScheduler([
+        Lane(name="interactive", queue_url="a", weight=3),
+        Lane(name="write", queue_url="b", max_concurrent=2),
+    ], total=4)
+    
+    # The write lane stops at its cap even though slots are free
+    await scheduler.acquire("write")
+    assert scheduler.claim_more("write", 10) == 1
+    assert scheduler.running("write") == 2
+    
+    # With nobody else waiting, a lane takes every free slot at once
+    await scheduler.acquire("interactive")
+    assert scheduler.claim_more("interactive", 10) == 1
+    assert scheduler.free == 0
+    
+    # A waiting lane gets the next free slot and blocks extra claims by others
+    waiter = asyncio.create_task(scheduler.acquire("interactive"))
+    await asyncio.sleep(0)
+    assert scheduler.contended("write")
+    scheduler.release("write")
+    await waiter
+    assert scheduler.running("interactive") == 3
+    assert scheduler.claim_more("write", 10) == 0
@@ -0,0 +1,115 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+from agent.repo_cache import RepositoryCache
+
+
+def git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    repo = tmp_path / "upstream"
+    repo.mkdir()
+    git("init", "-q", "-b", "main", cwd=repo)
+    (repo / "README.md").write_text("hello\n")
+    git("add", ".", cwd=repo)
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init", cwd=repo)
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_clones_share_mirror_and_pick_up_new_commits(tmp_path, upstream):
+    cache = RepositoryCache(base_dir=str(tmp_path / "cache"), fetch_interval=0)
+    env = dict(os.environ)
+    url = str(upstream)
+    
+    first = tmp_path / "s1"
+    await cache.clone(url, url, first, env)
+    assert (first / "README.md").read_text() == "hello\n"
+    # Objects come from the mirror through alternates
+    assert (first / ".git" / "objects" / "info" / "alternates").exists()
+    
+    (upstream / "NEW.md").write_text("new\n")
+    git("add", ".", cwd=upstream)
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "second", cwd=upstream)
+    
+    second = tmp_path / "s2"
+    await cache.clone(url, url, second, env)
+    assert (second / "NEW.md").exists()
+    assert len(list((tmp_path / "cache").glob("*.git"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_worktree_and_reflink_materialization(tmp_path, upstream):
+    cache = RepositoryCache(base_dir=str(tmp_path / "cache"), fetch_interval=0)
+    env = dict(os.environ)
+    url = str(upstream)
+    
+    worktree = tmp_path / "wt"
+    await cache.add_worktree(url, url, worktree, env)
+    assert (worktree / "README.md").read_text() == "hello\n"
+    assert (worktree / ".git").is_file()
+    
+    copies = [tmp_path / "c1", tmp_path / "c2"]
+    for dest in copies:
+        await cache.reflink_clone(url, url, dest, env)
+        assert (dest / "README.md").read_text() == "hello\n"
+    
+    # Copies are independent checkouts pointing at the real remote
+    (copies[0] / "README.md").write_text("changed\n")
+    assert (copies[1] / "README.md").read_text() == "hello\n"
+    remote = subprocess.run(
+        ["git", "remote", "get-url", "origin"], cwd=copies[1], capture_output=True, text=True
+    ).stdout.strip()
+    assert remote == url
+
+
+
+@pytest.mark.asyncio
+async def test_mirror_never_stores_credentials(tmp_path, upstream):
+    cache = RepositoryCache(base_dir=str(tmp_path / "cache"), fetch_interval=0)
+    env = dict(os.environ)
+    # Stands in for the token-bearing URL of a private repository
+    auth_url = str(upstream)
+    url = "https://github.com/o/r"
+    
+    await cache.clone(url, auth_url, tmp_path / "s1", env)
+    (upstream / "NEW.md").write_text("new\n")
+    git("add", ".", cwd=upstream)
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "second", cwd=upstream)
+    await cache.clone(url, auth_url, tmp_path / "s2", env)
+    
+    # Fetching still authenticates, but the mirror's config only knows the plain URL
+    assert (tmp_path / "s2" / "NEW.md").exists()
+    mirror = cache.mirror_path(url)
+    assert auth_url not in (mirror / "config").read_text()
+    assert url in (mirror / "config").read_text()
+
+
+@pytest.mark.asyncio
+async def test_evicts_idle_mirrors_by_age_and_size(tmp_path, upstream):
+    cache = RepositoryCache(base_dir=str(tmp_path / "cache"), max_bytes=10 ** 12, max_age=3600, min_idle=60)
+    env = dict(os.environ)
+    urls = ["https://github.com/o/old", "https://github.com/o/idle", "https://github.com/o/busy"]
+    for i, url in enumerate(urls):
+        await cache.reflink_clone(url, str(upstream), tmp_path / f"s{i}", env)
+    old, idle, busy = (cache.mirror_path(url) for url in urls)
+    now = time.time()
+    cache._used_at[str(old)] = now - 7200
+    cache._used_at[str(idle)] = now - 120
+    
+    # Past max_age goes regardless of size, along with its template checkout
+    await cache.evict()
+    assert not old.exists() and not old.with_suffix(".checkout").exists()
+    assert idle.exists() and busy.exists()
+    
+    # Over budget, idle mirrors go oldest first but ones that may back a running session stay
+    cache.max_bytes = 0
+    await cache.evict()
+    assert not idle.exists()
+    assert busy.exists()
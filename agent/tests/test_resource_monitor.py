@@ -0,0 +1,34 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from agent.resource_monitor import ResourceMonitor
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"), reason="requires /proc")
+@pytest.mark.asyncio
+async def test_samples_process_tree():
+    # The child burns CPU and holds ~64 MB while its own child sleeps
+    script = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(1)'])\n"
+        "data = bytearray(64 * 1024 * 1024)\n"
+        "end = time.process_time() + 0.5\n"
+        "while time.process_time() < end: pass\n"
+        "time.sleep(0.3)\n"
+        "child.wait()\n"
+    )
+    proc = await asyncio.create_subprocess_exec(sys.executable, "-c", script, start_new_session=True)
+    monitor = ResourceMonitor(proc.pid, interval=0.05)
+    monitor.start()
+    
+    await proc.wait()
+    usage = monitor.stop()
+    
+    assert usage["processes"] == 2
+    assert usage["cpu_seconds"] >= 0.3
+    assert usage["peak_rss_bytes"] >= 64 * 1024 * 1024
+    assert usage["wall_seconds"] >= 0.8
+    assert usage["samples"] > 5
@@ -0,0 +1,189 @@
+import pytest
+
+from agent.claude_code import ClaudeCodeWrapper
+from agent.config import config
+from agent.event_parser import EventType
+from agent.result_cache import TaskResultCache, cache_key
+from agent.session import SessionManager
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis for the result cache"""
+    
+    def __init__(self):
+        self.values = {}
+        self.zsets = {}
+        self.hashes = {}
+        
+    async def get(self, key):
+        return self.values.get(key)
+        
+    async def set(self, key, value, ex=None):
+        self.values[key] = value if isinstance(value, bytes) else str(value).encode()
+        
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            
+    async def incrby(self, key, amount):
+        self.values[key] = str(int(self.values.get(key, 0)) + amount).encode()
+        
+    async def decrby(self, key, amount):
+        await self.incrby(key, -amount)
+        
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+        
+    async def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+            
+    async def zrange(self, key, start, end):
+        members = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        return [m.encode() for m, _ in members][start:end + 1]
+        
+    async def zrangebyscore(self, key, low, high):
+        return [m.encode() for m, score in self.zsets.get(key, {}).items() if score <= high]
+        
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+        
+    async def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+        
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value).encode()
+        
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+            
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+        
+    async def __aenter__(self):
+        return self
+        
+    async def __aexit__(self, *exc):
+        return False
+        
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+        return lambda *args, **kwargs: self.calls.append((method, args, kwargs))
+        
+    async def execute(self):
+        for method, args, kwargs in self.calls:
+            await method(*args, **kwargs)
+
+
+def run_events(text):
+    return [
+        {"type": EventType.OUTPUT, "data": {"type": "assistant", "text": text}},
+        {"type": EventType.COMPLETION, "status": "completed", "summary": {"tools_used": []}},
+    ]
+
+
+def test_cache_key_normalizes_prompt_only():
+    key = cache_key("https://github.com/o/r.git", "abc", "ask", "  What does  this do? ", "m")
+    assert key == cache_key("https://github.com/o/r", "abc", "ask", "What does this do?", "m")
+    assert key != cache_key("https://github.com/o/r", "abd", "ask", "What does this do?", "m")
+    assert key != cache_key("https://github.com/o/r", "abc", "review", "What does this do?", "m")
+    assert key != cache_key("https://github.com/o/r", "abc", "ask", "what does this do?", "m")
+
+
+@pytest.mark.asyncio
+async def test_round_trip_and_size_eviction():
+    redis = FakeRedis()
+    cache = TaskResultCache(redis, ttl=3600, max_bytes=10 ** 6, max_entry_bytes=10 ** 6)
+    
+    assert await cache.get("k1") is None
+    assert await cache.put("k1", run_events("first"))
+    events = await cache.get("k1")
+    assert events[-1]["type"] is EventType.COMPLETION
+    assert events[0]["data"]["text"] == "first"
+    
+    # Past the size limit the oldest entries go first
+    size = int(redis.values["agent:result:bytes"])
+    cache.max_bytes = size * 2
+    assert await cache.put("k2", run_events("second"))
+    assert await cache.put("k3", run_events("third"))
+    assert await cache.get("k1") is None
+    assert await cache.get("k3") is not None
+    assert int(redis.values["agent:result:bytes"]) <= cache.max_bytes
+    
+    # Entries over the per-entry limit are never stored
+    cache.max_entry_bytes = 10
+    assert not await cache.put("k4", run_events("fourth"))
+
+
+@pytest.mark.asyncio
+async def test_hit_short_circuits_execute_task(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "repo_cache_enabled", False)
+    session_manager = SessionManager(base_dir=str(tmp_path))
+    wrapper = ClaudeCodeWrapper(session_manager)
+    wrapper.result_cache = TaskResultCache(FakeRedis(), ttl=3600, max_bytes=10 ** 6, max_entry_bytes=10 ** 6)
+    
+    async def fixed_key(*args, **kwargs):
+        return "key"
+    monkeypatch.setattr(wrapper, "_result_cache_key", fixed_key)
+    
+    def no_session(*args, **kwargs):
+        raise AssertionError("a cache hit must not create a session")
+    monkeypatch.setattr(wrapper.session_manager, "create_session", no_session)
+    
+    await wrapper.result_cache.put("key", run_events("cached answer"))
+    task = {"id": "t1", "repository_url": "https://github.com/o/r", "prompt": "Explain", "mode": "ask"}
+    events = [event async for event in wrapper.execute_task(task)]
+    
+    assert events[0]["status"] == "using_cached_result"
+    assert events[-1]["type"] == EventType.COMPLETION
+    assert events[-1]["summary"]["cached"] is True
+    assert all(event["task_id"] == "t1" for event in events)
+    
+    session_manager.close()
+
+
+@pytest.mark.asyncio
+async def test_oversized_run_is_not_recorded(monkeypatch, tmp_path):
+    """A run bigger than a cache entry is streamed through without being kept for the cache"""
+    monkeypatch.setattr(config, "repo_cache_enabled", False)
+    session_manager = SessionManager(base_dir=str(tmp_path))
+    wrapper = ClaudeCodeWrapper(session_manager)
+    wrapper.result_cache = TaskResultCache(FakeRedis(), ttl=3600, max_bytes=10 ** 6, max_entry_bytes=4096)
+    stored = []
+    
+    async def fixed_key(*args, **kwargs):
+        return "key"
+    monkeypatch.setattr(wrapper, "_result_cache_key", fixed_key)
+    
+    async def no_clone(*args, **kwargs):
+        pass
+    monkeypatch.setattr(wrapper, "_clone_repository", no_clone)
+    
+    async def record_store(events, *args):
+        stored.append(events)
+    monkeypatch.setattr(wrapper, "_store_result", record_store)
+    
+    run = run_events("answer")
+    
+    async def fake_run(*args):
+        for event in run:
+            yield dict(event)
+    monkeypatch.setattr(wrapper, "_run_claude", fake_run)
+    
+    task = {"id": "t1", "repository_url": "https://github.com/o/r", "prompt": "Explain", "mode": "ask"}
+    [event async for event in wrapper.execute_task(task)]
+    assert len(stored) == 1
+    
+    run.insert(0, {"type": EventType.TOOL_USE, "tool": "Write", "parameters": {"content": "x" * 10000}})
+    events = [event async for event in wrapper.execute_task(task)]
+    assert events[-1]["type"] == EventType.COMPLETION
+    assert len(stored) == 1
+    
+    session_manager.close()
@@ -0,0 +1,36 @@
+from agent.event_parser import EventType
+from agent.run_summary import RunSummary
+
+
+def test_summary_tracks_tools_errors_and_usage():
+    summary = RunSummary()
+    events = [
+        {"type": EventType.PROGRESS, "status": "started"},
+        {"type": EventType.TOOL_USE, "tool": "Read", "status": "started"},
+        {"type": EventType.TOOL_USE, "tool": "Read", "status": "completed"},
+        {"type": EventType.TOOL_USE, "tool": "Edit", "status": "completed"},
+        {"type": EventType.TOOL_USE, "tool": "Read", "status": "completed"},
+        {"type": EventType.OUTPUT, "data": {"type": "assistant", "message": {"usage": {"input_tokens": 10, "output_tokens": 5}}}},
+        {"type": EventType.OUTPUT, "data": {"type": "result", "total_cost_usd": 0.12, "num_turns": 3, "usage": {"input_tokens": 120, "output_tokens": 40}}},
+        {"type": EventType.COMPLETION, "summary": {"changes": [{"path": "a.py", "action": "modified"}]}},
+    ]
+    for event in events:
+        summary.add(event)
+        
+    assert summary.completed
+    result = summary.to_dict()
+    assert result["total_events"] == len(events)
+    assert result["tools_used"] == ["Read", "Edit"]
+    assert result["tool_counts"] == {"Read": 2, "Edit": 1}
+    assert result["files_changed"] == [{"path": "a.py", "action": "modified"}]
+    assert result["usage"] == {"input_tokens": 120, "output_tokens": 40, "cost_usd": 0.12, "num_turns": 3}
+
+
+def test_error_marks_run_as_not_completed():
+    summary = RunSummary()
+    summary.add({"type": EventType.ERROR, "error": "boom"})
+    summary.add({"type": EventType.COMPLETION, "summary": {}})
+    
+    assert not summary.completed
+    assert summary.first_error_event["error"] == "boom"
+    assert summary.to_dict()["errors"] == ["boom"]
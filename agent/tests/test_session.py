@@ -0,0 +1,41 @@
+import time
+
+from agent.session import SessionManager, TRASH_DIR_NAME
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_cleanup_moves_session_out_and_deletes_in_background(tmp_path):
+    manager = SessionManager(base_dir=str(tmp_path))
+    session = manager.create_session("task-1", "https://github.com/example/repo")
+    (session.repo_dir / "big").mkdir(parents=True)
+    (session.repo_dir / "big" / "file.txt").write_text("x" * 1024)
+    
+    manager.cleanup_session(session)
+    
+    # The session directory is renamed away immediately
+    assert not session.session_dir.exists()
+    assert wait_for(lambda: not any((tmp_path / TRASH_DIR_NAME).iterdir()))
+    manager.close()
+
+
+def test_startup_sweeps_orphaned_sessions(tmp_path):
+    orphan = tmp_path / "old-task-1234abcd" / "workspace"
+    orphan.mkdir(parents=True)
+    # The base dir may be shared; only directories named like our sessions are swept
+    unrelated = tmp_path / "someone-elses-files"
+    unrelated.mkdir()
+    
+    manager = SessionManager(base_dir=str(tmp_path))
+    
+    assert not orphan.exists()
+    assert unrelated.exists()
+    assert wait_for(lambda: not any((tmp_path / TRASH_DIR_NAME).iterdir()))
+    manager.close()
@@ -0,0 +1,113 @@
+import asyncio
+import subprocess
+
+import pytest
+
+from agent.git import run_git
+from agent.session import SessionManager
+from agent.session_pool import WarmSessionPool
+from agent.supervisor import TaskStopped, TaskSupervisor
+
+
+def git(*args, cwd):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True
+    )
+
+
+@pytest.fixture
+def origin(tmp_path):
+    repo = tmp_path / "origin"
+    repo.mkdir()
+    git("init", "-q", "-b", "main", cwd=repo)
+    (repo / "README.md").write_text("v1\n")
+    git("add", ".", cwd=repo)
+    git("commit", "-q", "-m", "v1", cwd=repo)
+    return repo
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = SessionManager(base_dir=str(tmp_path / "sessions"))
+    yield manager
+    manager.close()
+
+
+async def clone(session):
+    session.repo_dir.parent.mkdir(parents=True, exist_ok=True)
+    await run_git("clone", "-q", session.repository_url, str(session.repo_dir))
+
+
+async def wait_until(predicate, timeout=5.0):
+    for _ in range(int(timeout / 0.02)):
+        if predicate():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("condition not met in time")
+
+
+@pytest.mark.asyncio
+async def test_acquire_refreshes_workspace_and_replenishes(origin, manager):
+    pool = WarmSessionPool(manager, clone, [str(origin)], size=2)
+    await pool.start()
+    await wait_until(lambda: pool.ready_count(str(origin)) == 2)
+    
+    # The remote moved on after the workspace was cloned
+    (origin / "README.md").write_text("v2\n")
+    git("commit", "-q", "-am", "v2", cwd=origin)
+    
+    session = await pool.acquire("task-1", str(origin))
+    assert session.task_id == "task-1"
+    assert (session.repo_dir / "README.md").read_text() == "v2\n"
+    
+    await wait_until(lambda: pool.ready_count(str(origin)) == 2)
+    assert await pool.acquire("task-2", "https://github.com/example/other") is None
+    
+    manager.cleanup_session(session)
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_stale_session_is_discarded(origin, manager, tmp_path):
+    pool = WarmSessionPool(manager, clone, [str(origin)], size=1)
+    await pool.start()
+    await wait_until(lambda: pool.ready_count(str(origin)) == 1)
+    stale = pool._ready[next(iter(pool._ready))][0]
+    
+    # The fetch fails once the remote is gone
+    origin.rename(tmp_path / "moved")
+    assert await pool.acquire("task-1", str(origin)) is None
+    assert not stale.session_dir.exists()
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_cleans_up_ready_sessions(origin, manager):
+    pool = WarmSessionPool(manager, clone, [str(origin)], size=2)
+    await pool.start()
+    await wait_until(lambda: pool.ready_count(str(origin)) == 2)
+    ready = list(pool._ready[next(iter(pool._ready))])
+    
+    await pool.stop()
+    assert pool.ready_count(str(origin)) == 0
+    assert not any(session.session_dir.exists() for session in ready)
+    assert not pool._fillers
+
+
+
+@pytest.mark.asyncio
+async def test_hung_refresh_is_bounded_by_task_deadline(origin, manager, monkeypatch):
+    pool = WarmSessionPool(manager, clone, [str(origin)], size=1)
+    session = manager.create_session("warm", str(origin))
+    pool._ready[next(iter(pool._ready))].append(session)
+    
+    async def hung_git(*args, **kwargs):
+        await asyncio.sleep(3600)
+    monkeypatch.setattr("agent.session_pool.run_git", hung_git)
+    
+    supervisor = TaskSupervisor(0.1, 0, 1.0)
+    with pytest.raises(TaskStopped):
+        await supervisor.run(pool.acquire("task-1", str(origin)))
+    # The half-refreshed workspace is discarded, not leaked
+    assert not session.session_dir.exists()
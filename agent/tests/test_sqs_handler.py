@@ -0,0 +1,174 @@
+import pytest
+
+from agent.config import config
+from agent.event_parser import EventType
+from agent.sqs_handler import SQSTaskHandler
+
+
+class FakeSQS:
+    def __init__(self):
+        self.visibility = []
+        self.deleted = []
+        self.batches = []
+        
+    async def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout):
+        self.visibility.append((ReceiptHandle, VisibilityTimeout))
+        
+    async def delete_message(self, QueueUrl, ReceiptHandle):
+        self.deleted.append(ReceiptHandle)
+        
+    async def change_message_visibility_batch(self, QueueUrl, Entries):
+        self.batches.append((QueueUrl, Entries))
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+
+class FakeAWS:
+    def __init__(self):
+        self._sqs = FakeSQS()
+        
+    async def sqs(self):
+        return self._sqs
+        
+    async def s3(self):
+        raise AssertionError("failed runs shouldn't touch S3")
+
+
+class FailingClaude:
+    def __init__(self, error):
+        self.error = error
+        self.runs = 0
+        
+    async def execute_task(self, task):
+        self.runs += 1
+        yield {"type": EventType.ERROR, "error": self.error}
+
+
+class RaisingClaude:
+    def __init__(self, error):
+        self.error = error
+        
+    async def execute_task(self, task):
+        raise self.error
+        yield
+
+
+def make_handler(claude):
+    handler = SQSTaskHandler(claude, aws_clients=FakeAWS())
+    handler.queue_url = "https://sqs.test/tasks"
+    handler.statuses = []
+    
+    async def record_status(task_id, status, data):
+        handler.statuses.append((status, data))
+        
+    handler._send_status_update = record_status
+    return handler
+
+
+def message(receive_count):
+    return {
+        "ReceiptHandle": f"receipt-{receive_count}",
+        "Body": '{"id": "task-1", "mode": "read"}',
+        "Attributes": {"ApproximateReceiveCount": str(receive_count)},
+    }
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_counts_first_receive_as_first_attempt(monkeypatch):
+    """MAX_TASK_RETRIES=3 allows four runs: receives 1-3 retry, receive 4 fails for good"""
+    monkeypatch.setattr(config, "max_task_retries", 3)
+    claude = FailingClaude("API Error: 529 overloaded")
+    handler = make_handler(claude)
+    sqs = handler.aws._sqs
+    
+    for receive_count in (1, 2, 3):
+        handler.statuses.clear()
+        await handler.process_message(message(receive_count))
+        
+        started, retrying = handler.statuses
+        assert started == ("PROCESSING", {"message": f"Task processing started (attempt {receive_count})"})
+        assert retrying[0] == "RETRYING"
+        assert retrying[1]["retry_count"] == receive_count
+        assert retrying[1]["message"] == f"Task will be retried (attempt {receive_count + 1})"
+        
+    handler.statuses.clear()
+    await handler.process_message(message(4))
+    
+    assert [status for status, _ in handler.statuses] == ["PROCESSING", "FAILED"]
+    assert handler.statuses[0][1]["message"] == "Task processing started (attempt 4)"
+    assert claude.runs == 4
+    assert [receipt for receipt, _ in sqs.visibility] == ["receipt-1", "receipt-2", "receipt-3"]
+    assert sqs.deleted == ["receipt-4"]
+    
+    # Backoff grows from the first attempt: ceilings of 30s, 60s and 120s with equal jitter
+    delays = [delay for _, delay in sqs.visibility]
+    for delay, ceiling in zip(delays, (30, 60, 120)):
+        assert ceiling / 2 <= delay <= ceiling
+        
+    await handler.close()
+
+
+@pytest.mark.asyncio
+async def test_receive_past_retry_budget_is_rejected_without_running(monkeypatch):
+    monkeypatch.setattr(config, "max_task_retries", 3)
+    claude = FailingClaude("API Error: 529 overloaded")
+    handler = make_handler(claude)
+    
+    await handler.process_message(message(5))
+    
+    assert claude.runs == 0
+    assert handler.statuses == [("FAILED", {
+        "error": "Task failed after 4 attempts",
+        "message": "Task exceeded retry limit"
+    })]
+    assert handler.aws._sqs.deleted == ["receipt-5"]
+    
+    await handler.close()
+
+
+@pytest.mark.asyncio
+async def test_return_messages_makes_them_visible_on_their_queue():
+    handler = make_handler(FailingClaude("unused"))
+    
+    await handler.return_messages([message(1), message(2)], queue_url="https://sqs.test/urgent")
+    
+    assert handler.aws._sqs.batches == [("https://sqs.test/urgent", [
+        {"Id": "0", "ReceiptHandle": "receipt-1", "VisibilityTimeout": 0},
+        {"Id": "1", "ReceiptHandle": "receipt-2", "VisibilityTimeout": 0},
+    ])]
+    
+    await handler.close()
+
+
+@pytest.mark.asyncio
+async def test_exception_is_retried_after_backoff(monkeypatch):
+    """A crash mid-task waits out the backoff, not the lease the heartbeat last set"""
+    monkeypatch.setattr(config, "max_task_retries", 3)
+    handler = make_handler(RaisingClaude(RuntimeError("S3 went away")))
+    
+    await handler.process_message(message(2))
+    
+    status, data = handler.statuses[-1]
+    assert status == "RETRYING"
+    assert data["cause"] == "exception"
+    (receipt, delay), = handler.aws._sqs.visibility
+    assert receipt == "receipt-2"
+    assert 30 <= delay <= 60
+    assert handler.aws._sqs.deleted == []
+    
+    await handler.close()
+
+
+@pytest.mark.asyncio
+async def test_permanent_exception_is_not_retried(monkeypatch):
+    monkeypatch.setattr(config, "max_task_retries", 3)
+    handler = make_handler(RaisingClaude(RuntimeError("Invalid API key")))
+    
+    await handler.process_message(message(1))
+    
+    status, data = handler.statuses[-1]
+    assert status == "FAILED"
+    assert data["cause"] == "auth"
+    assert handler.aws._sqs.visibility == []
+    assert handler.aws._sqs.deleted == ["receipt-1"]
+    
+    await handler.close()
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from agent.event_parser import EventType
+from agent.status_publisher import StatusPublisher
+
+
+class RecordingSender:
+    def __init__(self):
+        self.batches = []
+        
+    async def __call__(self, entries):
+        self.batches.append([json.loads(e["MessageBody"]) for e in entries])
+        return []
+
+
+def progress(event):
+    return {"task_id": "t1", "status": "PROCESSING", "progress": event}
+
+
+@pytest.mark.asyncio
+async def test_progress_updates_are_coalesced_until_terminal_flush():
+    sender = RecordingSender()
+    publisher = StatusPublisher(sender, flush_interval=60)
+    
+    for i in range(50):
+        await publisher.publish("t1", "PROCESSING", progress({"type": EventType.PROGRESS, "step": i}))
+    await publisher.publish("t1", "PROCESSING", progress({"type": EventType.TOOL_USE, "tool": "Read", "status": "started"}))
+    await publisher.publish("t1", "PROCESSING", progress({"type": EventType.TOOL_USE, "tool": "Read", "status": "completed"}))
+    
+    # Nothing is sent until the task reaches a terminal state
+    assert sender.batches == []
+    await publisher.publish("t1", "COMPLETED", {"task_id": "t1", "status": "COMPLETED"})
+    
+    assert len(sender.batches) == 1
+    sent = sender.batches[0]
+    assert [m["status"] for m in sent] == ["PROCESSING", "PROCESSING", "COMPLETED"]
+    assert sent[0]["progress"]["step"] == 49
+    assert sent[1]["progress"]["status"] == "completed"
+    await publisher.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_of_the_same_tool_are_kept_apart():
+    sender = RecordingSender()
+    publisher = StatusPublisher(sender, flush_interval=60)
+    
+    for tool_id in ("a", "b"):
+        await publisher.publish("t1", "PROCESSING", progress({"type": EventType.TOOL_USE, "tool": "Read", "tool_id": tool_id, "status": "started"}))
+    await publisher.publish("t1", "PROCESSING", progress({"type": EventType.TOOL_USE, "tool": "Read", "tool_id": "a", "status": "completed"}))
+    await publisher.publish("t1", "COMPLETED", {"task_id": "t1", "status": "COMPLETED"})
+    
+    sent = [(m["progress"]["tool_id"], m["progress"]["status"]) for m in sender.batches[0] if "progress" in m]
+    assert sent == [("b", "started"), ("a", "completed")]
+    await publisher.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_splits_into_batches_of_ten():
+    sender = RecordingSender()
+    publisher = StatusPublisher(sender, flush_interval=60)
+    
+    for i in range(25):
+        tool = {"type": EventType.TOOL_USE, "tool": f"Tool{i}", "status": "completed"}
+        await publisher.publish(f"t{i}", "PROCESSING", progress(tool))
+    await publisher.close()
+    
+    assert [len(b) for b in sender.batches] == [10, 10, 5]
@@ -0,0 +1,60 @@
+import asyncio
+import sys
+
+import pytest
+
+from agent.stream_reader import StderrDrain, iter_lines
+
+
+def feed(chunks):
+    reader = asyncio.StreamReader()
+    for chunk in chunks:
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    return reader
+
+
+async def collect(reader, **kwargs):
+    return [line async for line in iter_lines(reader, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_lines_larger_than_stream_limit():
+    big = b'{"content": "' + b"x" * (3 * 1024 * 1024) + b'"}\n'
+    data = b"first\n" + big + b"last"
+    # Split into odd-sized chunks so lines straddle chunk boundaries
+    chunks = [data[i:i + 70_001] for i in range(0, len(data), 70_001)]
+    
+    lines = await collect(feed(chunks), chunk_size=4096)
+    
+    assert lines == [b"first\n", big, b"last"]
+
+
+@pytest.mark.asyncio
+async def test_oversized_lines_are_discarded():
+    data = b"a\n" + b"y" * 10_000 + b"\nb\n"
+    
+    lines = await collect(feed([data]), chunk_size=1024, max_line_bytes=4096)
+    
+    assert lines == [b"a\n", b"b\n"]
+
+
+@pytest.mark.asyncio
+async def test_stderr_drained_while_reading_stdout():
+    # Far more stderr than a pipe buffer holds, written before any stdout
+    script = "import sys\nfor i in range(20000): sys.stderr.write(f'warning {i}\\n')\nprint('done')"
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", script,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stderr = StderrDrain(proc.stderr, tail_lines=3, max_pending=10)
+    
+    lines = await asyncio.wait_for(collect(proc.stdout), timeout=30)
+    await proc.wait()
+    await stderr.wait()
+    
+    assert lines == [b"done\n"]
+    assert stderr.lines_read == 20000
+    assert stderr.tail_text() == "warning 19997\nwarning 19998\nwarning 19999"
+    assert len(stderr.pending()) == 10
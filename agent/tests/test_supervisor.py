@@ -0,0 +1,53 @@
+import asyncio
+import sys
+
+import pytest
+
+from agent.supervisor import STOP_CANCELLED, STOP_IDLE_TIMEOUT, STOP_TIMEOUT, TaskStopped, TaskSupervisor
+
+
+async def spawn(script):
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-c", script,
+        stdout=asyncio.subprocess.PIPE,
+        start_new_session=True
+    )
+
+
+@pytest.mark.asyncio
+async def test_idle_timeout_stops_silent_process():
+    supervisor = TaskSupervisor(timeout=30, idle_timeout=0.3, kill_grace=5)
+    proc = await spawn("import time; time.sleep(30)")
+    supervisor.watch(proc)
+    
+    await asyncio.wait_for(proc.wait(), timeout=10)
+    supervisor.close()
+    
+    assert supervisor.reason == STOP_IDLE_TIMEOUT
+    assert proc.returncode < 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_escalates_to_sigkill():
+    supervisor = TaskSupervisor(timeout=30, idle_timeout=0, kill_grace=0.3)
+    script = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(30)"
+    proc = await spawn(script)
+    supervisor.watch(proc)
+    await proc.stdout.readline()
+    
+    supervisor.request_stop(STOP_CANCELLED)
+    await asyncio.wait_for(proc.wait(), timeout=10)
+    supervisor.close()
+    
+    assert supervisor.reason == STOP_CANCELLED
+    assert proc.returncode == -9
+
+
+@pytest.mark.asyncio
+async def test_setup_step_bounded_by_deadline():
+    supervisor = TaskSupervisor(timeout=0.2, idle_timeout=0, kill_grace=1)
+    
+    with pytest.raises(TaskStopped) as stopped:
+        await supervisor.run(asyncio.sleep(30))
+        
+    assert stopped.value.reason == STOP_TIMEOUT
@@ -0,0 +1,99 @@
+import asyncio
+import types
+
+import pytest
+
+from agent import visibility
+from agent.visibility import RETRY_DELAY_SECONDS, VisibilityHeartbeat
+
+
+class FakeClock:
+    """Virtual time for the heartbeat: sleeping advances the clock instantly"""
+    
+    def __init__(self):
+        self.now = 0.0
+        
+    def time(self):
+        return self.now
+        
+    async def sleep(self, delay):
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    fake_asyncio = types.SimpleNamespace(
+        sleep=clock.sleep,
+        get_running_loop=lambda: clock,
+        create_task=asyncio.create_task,
+        current_task=asyncio.current_task,
+        CancelledError=asyncio.CancelledError
+    )
+    monkeypatch.setattr(visibility, "asyncio", fake_asyncio)
+    return clock
+
+
+async def settle(rounds=100):
+    for _ in range(rounds):
+        await asyncio.sleep(0)
+
+
+def recorder(clock, failures=0):
+    calls = []
+    
+    async def change_visibility(receipt_handle, timeout):
+        calls.append((clock.now, timeout))
+        if len(calls) <= failures:
+            raise RuntimeError("throttled")
+    return calls, change_visibility
+
+
+@pytest.mark.asyncio
+async def test_extensions_double_up_to_max_and_stop_at_max_lease(clock):
+    calls, change_visibility = recorder(clock)
+    heartbeat = VisibilityHeartbeat(change_visibility, visibility_timeout=60, max_extension=240, max_lease=1000)
+    
+    heartbeat.start("receipt", received_at=0.0)
+    await settle()
+    
+    timeouts = [timeout for _, timeout in calls]
+    assert timeouts[:3] == [120, 240, 240]
+    assert max(timeouts) == 240
+    # Every extension is renewed before the lease runs out, and none goes past max_lease
+    assert all(now + timeout <= 1000 for now, timeout in calls)
+    assert heartbeat.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_renewals(clock):
+    calls, change_visibility = recorder(clock)
+    heartbeat = VisibilityHeartbeat(change_visibility, visibility_timeout=60, max_extension=240, max_lease=43200)
+    
+    heartbeat.start("receipt", received_at=0.0)
+    await settle(5)
+    lease_task = heartbeat._leases["receipt"].task
+    
+    await heartbeat.stop("receipt")
+    renewals = len(calls)
+    await settle()
+    assert lease_task.cancelled()
+    assert heartbeat.in_flight == 0
+    assert len(calls) == renewals
+
+
+@pytest.mark.asyncio
+async def test_failed_extension_is_retried(clock):
+    calls, change_visibility = recorder(clock, failures=1)
+    heartbeat = VisibilityHeartbeat(change_visibility, visibility_timeout=60, max_extension=240, max_lease=43200)
+    
+    heartbeat.start("receipt", received_at=0.0)
+    await settle(5)
+    await heartbeat.close()
+    
+    (failed_at, failed_timeout), (retried_at, retried_timeout) = calls[:2]
+    assert retried_at - failed_at == RETRY_DELAY_SECONDS
+    assert retried_timeout == failed_timeout
+    # The retry still lands before the lease it is extending expires
+    assert retried_at < 60
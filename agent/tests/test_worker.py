@@ -0,0 +1,241 @@
+import asyncio
+import random
+
+import pytest
+
+from agent.backoff import ExponentialBackoff
+from agent.config import config
+from agent.lanes import SlotScheduler
+from agent.worker import AgentWorker
+
+
+@pytest.fixture
+def make_worker(monkeypatch, tmp_path):
+    # Keep the session reaper and repository cache away from the host's shared directories
+    monkeypatch.setattr(config, "session_base_dir", str(tmp_path / "sessions"))
+    monkeypatch.setattr(config, "repo_cache_dir", str(tmp_path / "repo-cache"))
+    # The fakes never reach AWS, but building clients mustn't depend on the host's settings either
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    workers = []
+    
+    def make():
+        worker = AgentWorker()
+        workers.append(worker)
+        return worker
+        
+    yield make
+    for worker in workers:
+        worker.session_manager.close()
+
+
+class FakeSQSHandler:
+    def __init__(self, durations):
+        self.pending = list(durations)
+        self.running = 0
+        self.peak = 0
+        self.finished = []
+        self.returned = []
+        
+    async def receive_messages(self, max_messages: int = 1, wait_time_seconds: int = 20, queue_url=None) -> list:
+        if not self.pending:
+            await asyncio.sleep(0.01)
+            return []
+        return [{"Body": self.pending.pop(0)}]
+        
+    async def process_message(self, message, queue_url=None):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(message["Body"])
+        self.running -= 1
+        self.finished.append(message["Body"])
+        
+    async def return_messages(self, messages, queue_url=None):
+        self.returned.extend((message["Body"], queue_url) for message in messages)
+
+
+@pytest.mark.asyncio
+async def test_long_task_does_not_block_free_slots(make_worker):
+    """A slow task keeps one slot busy while the others keep draining the queue"""
+    worker = make_worker()
+    worker.max_concurrent_tasks = 2
+    worker.scheduler = SlotScheduler(worker.lanes, 2)
+    worker.sqs_handler = FakeSQSHandler([0.5] + [0.01] * 10)
+    worker.running = True
+    
+    async def run_loop():
+        while worker.running:
+            await worker._process_messages(worker.lanes[0])
+            
+    loop_task = asyncio.create_task(run_loop())
+    await asyncio.sleep(0.3)
+    
+    # All short tasks finished while the long one is still running
+    assert len(worker.sqs_handler.finished) == 10
+    assert worker.busy_slots == 1
+    assert worker.sqs_handler.peak == 2
+    
+    worker.running = False
+    await asyncio.sleep(0.3)
+    await loop_task
+    assert worker.busy_slots == 0
+
+
+class BatchSQSHandler(FakeSQSHandler):
+    def __init__(self, durations):
+        super().__init__(durations)
+        self.requested = []
+        
+    async def receive_messages(self, max_messages: int = 1, wait_time_seconds: int = 20, queue_url=None) -> list:
+        self.requested.append(max_messages)
+        batch, self.pending = self.pending[:max_messages], self.pending[max_messages:]
+        return [{"Body": body} for body in batch]
+
+
+@pytest.mark.asyncio
+async def test_polls_for_as_many_messages_as_free_slots(make_worker):
+    worker = make_worker()
+    worker.max_concurrent_tasks = 4
+    worker.scheduler = SlotScheduler(worker.lanes, 4)
+    worker.sqs_handler = BatchSQSHandler([0.2] * 6)
+    worker.running = True
+    
+    await worker._process_messages(worker.lanes[0])
+    assert worker.sqs_handler.requested == [4]
+    assert worker.busy_slots == 4
+    
+    # Saturated: the next poll waits for a slot instead of calling SQS
+    poll = asyncio.create_task(worker._process_messages(worker.lanes[0]))
+    await asyncio.sleep(0.1)
+    assert worker.sqs_handler.requested == [4]
+    
+    await poll
+    # Unused slots from a short batch are released
+    assert worker.sqs_handler.requested == [4, 4]
+    assert worker.busy_slots == 2
+    worker.running = False
+    await asyncio.gather(*worker._in_flight)
+    assert worker.scheduler.free == 4
+
+
+class StoppingSQSHandler(BatchSQSHandler):
+    def __init__(self, worker, durations):
+        super().__init__(durations)
+        self.worker = worker
+        
+    async def receive_messages(self, max_messages: int = 1, wait_time_seconds: int = 20, queue_url=None) -> list:
+        # Shutdown begins while the long poll is in flight
+        self.worker.running = False
+        return await super().receive_messages(max_messages, wait_time_seconds, queue_url)
+
+
+@pytest.mark.asyncio
+async def test_messages_received_while_stopping_are_returned(make_worker):
+    """Messages that arrive after stop aren't left invisible for a whole visibility timeout"""
+    worker = make_worker()
+    worker.scheduler = SlotScheduler(worker.lanes, 2)
+    worker.sqs_handler = StoppingSQSHandler(worker, [0.1, 0.1])
+    worker.running = True
+    
+    await worker._process_messages(worker.lanes[0])
+    
+    lane = worker.lanes[0]
+    assert worker.sqs_handler.returned == [(0.1, lane.queue_url), (0.1, lane.queue_url)]
+    assert worker.sqs_handler.finished == []
+    assert not worker._in_flight
+    assert worker.scheduler.free == 2
+
+
+class ClosingSQSHandler(BatchSQSHandler):
+    def __init__(self, durations):
+        super().__init__(durations)
+        self.running_at_close = None
+        
+    async def close(self):
+        self.running_at_close = self.running
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_tasks_before_closing_handler(make_worker, monkeypatch):
+    """Visibility leases stay alive until running tasks have finished"""
+    worker = make_worker()
+    worker.scheduler = SlotScheduler(worker.lanes, 2)
+    worker.sqs_handler = ClosingSQSHandler([0.3, 0.3])
+    
+    async def no_op():
+        pass
+    monkeypatch.setattr(worker.claude_wrapper, "start", no_op)
+    
+    run = asyncio.create_task(worker.start())
+    await asyncio.sleep(0.1)
+    assert worker.busy_slots == 2
+    
+    await worker.stop()
+    await run
+    assert worker.sqs_handler.finished == [0.3, 0.3]
+    assert worker.sqs_handler.running_at_close == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_tears_down_shared_resources_after_drain(make_worker, monkeypatch):
+    """AWS clients, warm pool and session reaper outlive the tasks using them"""
+    worker = make_worker()
+    worker.scheduler = SlotScheduler(worker.lanes, 1)
+    worker.sqs_handler = ClosingSQSHandler([0.3])
+    running_at_teardown = {}
+    
+    async def no_op():
+        pass
+    monkeypatch.setattr(worker.claude_wrapper, "start", no_op)
+    
+    def recorder(name, coroutine=False):
+        def record():
+            running_at_teardown[name] = worker.sqs_handler.running
+        async def record_async():
+            record()
+        return record_async if coroutine else record
+    monkeypatch.setattr(worker.claude_wrapper, "stop", recorder("warm_pool", coroutine=True))
+    monkeypatch.setattr(worker.aws_clients, "close", recorder("aws", coroutine=True))
+    close_sessions = worker.session_manager.close
+    monkeypatch.setattr(worker.session_manager, "close", recorder("sessions"))
+    
+    run = asyncio.create_task(worker.start())
+    await asyncio.sleep(0.1)
+    await worker.stop()
+    await run
+    assert running_at_teardown == {"warm_pool": 0, "aws": 0, "sessions": 0}
+    close_sessions()
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_tasks_after_grace_period(make_worker, monkeypatch):
+    worker = make_worker()
+    worker.scheduler = SlotScheduler(worker.lanes, 1)
+    worker.sqs_handler = ClosingSQSHandler([30])
+    monkeypatch.setattr("agent.worker.config.shutdown_grace_seconds", 0.1)
+    
+    async def no_op():
+        pass
+    monkeypatch.setattr(worker.claude_wrapper, "start", no_op)
+    
+    run = asyncio.create_task(worker.start())
+    await asyncio.sleep(0.1)
+    assert worker.busy_slots == 1
+    
+    # The poller is blocked waiting for a slot and must not hold up shutdown
+    await asyncio.wait_for(worker.stop(), 5)
+    await run
+    assert worker.busy_slots == 0
+    assert worker.sqs_handler.finished == []
+
+
+def test_poll_backoff_grows_with_jitter():
+    backoff = ExponentialBackoff(base=1.0, cap=8.0, rng=random.Random(7))
+    
+    delays = [backoff.next_delay() for _ in range(6)]
+    assert all(0 <= d <= min(8.0, 2 ** i) for i, d in enumerate(delays))
+    assert backoff.ceiling(backoff.attempts) == 8.0
+    
+    backoff.reset()
+    assert backoff.next_delay() <= 1.0
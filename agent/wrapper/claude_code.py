@@ -4,16 +4,22 @@ import logging
 import os
 import shutil
 import tempfile
+from collections import deque
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Deque, Dict, Any, Optional
 
 import redis.asyncio as redis
 
+from agent.claude_binary import resolve_claude_binary
+
 from .event_parser import OutputParser
 from .session import SessionManager
 
 logger = logging.getLogger(__name__)
 
+# Number of trailing stderr lines kept for error reporting
+STDERR_TAIL_LINES = 200
+
 
 class MinimalClaudeWrapper:
     """Wrapper for running Claude Code CLI in a container."""
@@ -22,6 +28,7 @@ class MinimalClaudeWrapper:
         self.redis_client = redis_client
         self.output_parser = OutputParser()
         self.session_manager = SessionManager()
+        self.claude_binary = resolve_claude_binary(os.getenv("CLAUDE_BINARY"))
         
     async def process_tasks(self):
         """Main task processing loop (called by SQS handler)."""
@@ -81,7 +88,7 @@ class MinimalClaudeWrapper:
         
         # Build command
         cmd = [
-            "claude-code",  # Assuming claude-code is in PATH
+            self.claude_binary,
             "--prompt", prompt,
             "--output-format", "json",
             "--no-interactive"
@@ -99,22 +106,41 @@ class MinimalClaudeWrapper:
             cwd=workspace
         )
         
-        # Stream stdout
-        async for line in self._read_stream(process.stdout):
-            await self._process_output_line(task_id, line)
-            
-        # Stream stderr (for errors/warnings)
-        async for line in self._read_stream(process.stderr):
-            await self._publish_event(task_id, {
-                "type": "stderr",
-                "content": line
-            })
-            
-        # Wait for completion
-        return_code = await process.wait()
+        # Drain stderr concurrently; reading it only after stdout closes
+        # deadlocks once the child fills the stderr pipe
+        stderr_tail: Deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+        stderr_task = asyncio.create_task(self._drain_stderr(task_id, process.stderr, stderr_tail))
         
+        try:
+            # Stream stdout
+            async for line in self._read_stream(process.stdout):
+                await self._process_output_line(task_id, line)
+                
+            # Wait for completion
+            return_code = await process.wait()
+            await stderr_task
+        finally:
+            stderr_task.cancel()
+            
         if return_code != 0:
-            raise RuntimeError(f"Claude Code exited with code {return_code}")
+            tail = "\n".join(stderr_tail)
+            raise RuntimeError(f"Claude Code exited with code {return_code}: {tail}")
+            
+    async def _drain_stderr(self, task_id: str, stream, tail: Deque[str]) -> None:
+        """Keep the tail of stderr and publish its lines as low-priority events."""
+        try:
+            async for line in self._read_stream(stream):
+                tail.append(line)
+                try:
+                    await self._publish_event(task_id, {
+                        "type": "stderr",
+                        "content": line
+                    })
+                except Exception as e:
+                    # Diagnostics must never hold up the pipe
+                    logger.debug(f"Failed to publish stderr line: {e}")
+        except Exception as e:
+            logger.warning(f"Stopped reading stderr for task {task_id}: {e}")
             
     async def _read_stream(self, stream):
         """Read from async stream line by line."""
@@ -122,7 +148,7 @@ class MinimalClaudeWrapper:
             line = await stream.readline()
             if not line:
                 break
-            yield line.decode("utf-8").rstrip()
+            yield line.decode("utf-8", errors="replace").rstrip()
             
     async def _process_output_line(self, task_id: str, line: str) -> None:
         """Process a line of output from Claude Code."""
@@ -1,7 +1,9 @@
 import json
 import uuid
+from typing import Literal
 
 import aioboto3
+import redis.asyncio as redis
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
@@ -12,6 +14,9 @@ router = APIRouter()
 
 class TaskRequest(BaseModel):
     prompt: str = Field(..., min_length=1, description="The prompt for the task")
+    mode: Literal["write", "review", "ask", "analyze"] = Field(
+        "write", description="Execution mode; read-only modes can be routed to their own queue"
+    )
 
 
 class TaskResponse(BaseModel):
@@ -19,6 +24,11 @@ class TaskResponse(BaseModel):
     status: str
 
 
+def queue_url_for_mode(mode: str) -> str:
+    """Pick the SQS queue for a task mode, so quick read-only tasks skip the write backlog."""
+    return settings.TASK_QUEUE_URLS.get(mode, settings.TASK_QUEUE_URL)
+
+
 @router.post("/", response_model=TaskResponse)
 async def create_task(request: TaskRequest) -> TaskResponse:
     """Create a new task and send it to SQS queue."""
@@ -26,7 +36,7 @@ async def create_task(request: TaskRequest) -> TaskResponse:
     task_id = str(uuid.uuid4())
 
     # Prepare SQS message
-    message = {"task_id": task_id, "prompt": request.prompt}
+    message = {"task_id": task_id, "prompt": request.prompt, "mode": request.mode}
 
     try:
         # Create SQS client
@@ -36,9 +46,24 @@ async def create_task(request: TaskRequest) -> TaskResponse:
         ) as sqs:
             # Send message to SQS
             await sqs.send_message(
-                QueueUrl=settings.TASK_QUEUE_URL, MessageBody=json.dumps(message)
+                QueueUrl=queue_url_for_mode(request.mode), MessageBody=json.dumps(message)
             )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to queue task: {e!s}") from e
 
     return TaskResponse(task_id=task_id, status="queued")
+
+
+@router.post("/{task_id}/cancel", response_model=TaskResponse)
+async def cancel_task(task_id: str) -> TaskResponse:
+    """Ask the agent workers to stop a running task."""
+    redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        # Every worker subscribes; the one running the task stops it
+        await redis_client.publish(settings.TASK_CANCEL_CHANNEL, task_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to cancel task: {e!s}") from e
+    finally:
+        await redis_client.close()
+
+    return TaskResponse(task_id=task_id, status="cancelling")
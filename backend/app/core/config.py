@@ -15,8 +15,13 @@ class Settings(BaseSettings):
 
     # SQS Configuration
     TASK_QUEUE_URL: str = "http://localhost:4566/000000000000/tasks"
+    # Queue per task mode (JSON), e.g. {"ask": "...", "review": "..."}; other modes use TASK_QUEUE_URL
+    TASK_QUEUE_URLS: dict[str, str] = {}
     AWS_REGION: str = "us-east-1"
 
+    # Redis channel the agent workers listen on for task cancellations
+    TASK_CANCEL_CHANNEL: str = "agent:cancel"
+
     # Git Provider Tokens
     GITHUB_TOKEN: str | None = None
     GITLAB_TOKEN: str | None = None
@@ -8,6 +8,7 @@ import pytest
 from fastapi.testclient import TestClient
 from starlette.websockets import WebSocket
 
+from app.core.config import settings
 from app.main import app
 
 
@@ -60,6 +61,23 @@ def test_create_task_success(client, mock_sqs):
     assert "task_id" in message
 
 
+def test_create_task_routes_by_mode(client, mock_sqs):
+    """Test read-only modes go to their own queue when one is configured."""
+    routes = {"ask": "http://localhost:4566/000000000000/tasks-readonly"}
+    with patch("app.api.tasks.settings.TASK_QUEUE_URLS", routes):
+        response = client.post("/api/tasks/", json={"prompt": "What does this do?", "mode": "ask"})
+        assert response.status_code == 200
+        call_args = mock_sqs.send_message.call_args[1]
+        assert call_args["QueueUrl"] == routes["ask"]
+        assert json.loads(call_args["MessageBody"])["mode"] == "ask"
+
+        response = client.post("/api/tasks/", json={"prompt": "Fix the bug"})
+        assert response.status_code == 200
+        call_args = mock_sqs.send_message.call_args[1]
+        assert call_args["QueueUrl"] == settings.TASK_QUEUE_URL
+        assert json.loads(call_args["MessageBody"])["mode"] == "write"
+
+
 def test_create_task_invalid_request(client):
     """Test task creation with invalid request."""
     response = client.post("/api/tasks/", json={"invalid": "field"})
@@ -91,6 +109,20 @@ async def test_create_task_sqs_failure():
         assert "Failed to queue task" in str(exc_info.value)
 
 
+def test_cancel_task_publishes_to_workers(client):
+    """Test that cancelling a task notifies the agent workers."""
+    with patch("app.api.tasks.redis.from_url") as mock_redis_factory:
+        mock_redis = AsyncMock()
+        mock_redis_factory.return_value = mock_redis
+
+        response = client.post("/api/tasks/task-123/cancel")
+
+    assert response.status_code == 200
+    assert response.json() == {"task_id": "task-123", "status": "cancelling"}
+    mock_redis.publish.assert_called_once_with("agent:cancel", "task-123")
+    mock_redis.close.assert_called_once()
+
+
 def test_websocket_endpoint_exists(client):
     """Test that the WebSocket endpoint exists."""
     routes = [route.path for route in app.routes]